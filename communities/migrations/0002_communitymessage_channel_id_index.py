@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("communities", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="communitymessage",
+            index=models.Index(
+                fields=["channel", "id"], name="communities_channel_c8eefc_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 
 class Community(models.Model):
@@ -57,6 +58,15 @@ class CommunityMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['channel', 'id'])]
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'author': self.author.username,
+            'content': self.content,
+            'created_at': timezone.localtime(self.created_at).isoformat(),
+        }
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:30]}"
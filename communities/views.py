@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponseForbidden
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.views.decorators.http import condition
 from urllib.parse import unquote  # CHANGED
 
 from .models import Community, Channel, Membership, CommunityMessage
@@ -15,7 +16,8 @@ def community_list(request):
         qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
     if not request.user.is_authenticated:
         qs = qs.filter(is_public=True)
-    context = {'communities': qs.order_by('-created_at')}
+    # One grouped query instead of a COUNT per card
+    context = {'communities': qs.annotate(member_count=Count('memberships')).order_by('-created_at')}
     return render(request, 'communities/community_list.html', context)
 
 @login_required
@@ -66,10 +68,8 @@ def community_detail(request, slug, channel_slug=None):
         channel = get_object_or_404(Channel, community=community, slug=channel_slug)
 
     messages_qs = channel.messages.select_related('author')[:50]
-    # NEW: compute latest (newest) message ts using model ordering (-created_at)
-    latest_ts = None
-    if messages_qs:
-        latest_ts = timezone.localtime(messages_qs[0].created_at).isoformat()
+    # Live feed cursor: the highest message id already rendered
+    latest_id = max((m.id for m in messages_qs), default=0)
 
     form = CommunityMessageForm()
 
@@ -77,14 +77,13 @@ def community_detail(request, slug, channel_slug=None):
         'community': community,
         'channels': channels,
         'channel': channel,
-        'messages': messages_qs[::-1],  # oldest at top
+        'channel_messages': messages_qs[::-1],  # oldest at top
         'is_member': is_member,
         # NEW: pass role flags and a channel form for admins/owners
         'is_owner': is_owner,
         'is_admin': is_admin,
         'form': form,
-        # NEW
-        'latest_ts': latest_ts,
+        'latest_id': latest_id,
     }
     if is_admin:
         ctx['chan_form'] = ChannelForm()
@@ -126,6 +125,21 @@ def post_message(request, slug, channel_slug):
         })
     return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
 
+def _feed_etag(request, slug, channel_slug):
+    community = Community.objects.filter(slug=slug).values('pk', 'is_public').first()
+    if not community:
+        return None
+    if not community['is_public']:
+        if not (request.user.is_authenticated and
+                Membership.objects.filter(community_id=community['pk'], user=request.user).exists()):
+            return None
+    # Messages are append-only, so the newest id alone identifies the feed's state: one
+    # backwards step on the (channel, id) index, however long the channel is
+    last = (CommunityMessage.objects.filter(channel__community_id=community['pk'], channel__slug=channel_slug)
+            .order_by('-id').values_list('id', flat=True).first())
+    return f"feed-{community['pk']}-{channel_slug}-{last or 0}"
+
+@condition(etag_func=_feed_etag)
 def messages_feed(request, slug, channel_slug):
     # Simple polling feed
     community = get_object_or_404(Community, slug=slug)
@@ -144,13 +158,11 @@ def messages_feed(request, slug, channel_slug):
                 qs = qs.filter(created_at__gt=dt)
         except Exception:
             pass
-    data = [{
-        'id': m.id,  # NEW
-        'author': m.author.username,
-        'content': m.content,
-        'created_at': timezone.localtime(m.created_at).isoformat()
-    } for m in qs[:50]]
-    return JsonResponse({'results': data})
+    data = [m.as_dict() for m in qs[:50]]
+    resp = JsonResponse({'results': data})
+    # Always revalidate; unchanged polls are answered 304 from the ETag
+    resp['Cache-Control'] = 'private, no-cache'
+    return resp
 
 # NEW: create a channel (owner/admin only)
 @login_required
@@ -175,7 +187,7 @@ def channel_create(request, slug):
         'community': community,
         'channels': channels,
         'channel': default_channel,
-        'messages': messages_qs[::-1],
+        'channel_messages': messages_qs[::-1],
         'is_member': True,
         'is_owner': mem.role == 'owner',
         'is_admin': True,
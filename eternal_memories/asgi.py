@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eternal_memories.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup so consumers can use the ORM
+from memorials.routing import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
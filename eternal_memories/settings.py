@@ -68,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.unread_dms',
             ],
         },
     },
@@ -94,6 +95,39 @@ if os.environ.get('DATABASE_URL'):  # FIX
     except Exception:
         pass
 
+# Caches: 'default' is per-process unless REDIS_URL is set; 'ai_results' is durable
+# (shared across workers and restarts) and holds paid AI generations and precomputed
+# datasets such as the home constellation.
+# Run `python manage.py createcachetable` for the database-backed variant.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eterna-default',
+    },
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+AI_CACHE_TIMEOUT = int(os.environ.get('AI_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 5000))
+if os.environ.get('AI_CACHE_BACKEND', 'db') == 'file':
+    CACHES['ai_results'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AI_CACHE_DIR', str(BASE_DIR / '.cache' / 'ai_results')),
+        'TIMEOUT': AI_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': AI_CACHE_MAX_ENTRIES},
+    }
+else:
+    CACHES['ai_results'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'ai_result_cache',
+        'TIMEOUT': AI_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': AI_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 4},
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,8 +163,53 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # AI API Settings
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
+# Point at a local fake (python manage.py fake_groq_server) for offline development/tests
+GROQ_API_BASE = os.environ.get('GROQ_API_BASE', 'https://api.groq.com/openai/v1')
 AI_HORDE_API_KEY = os.environ.get('AI_HORDE_API_KEY', '')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')  # NEW
+# Background image generation (python manage.py process_image_jobs)
+IMAGE_JOB_MAX_ATTEMPTS = int(os.environ.get('IMAGE_JOB_MAX_ATTEMPTS', 2))
+MAX_IMAGE_DOWNLOAD_BYTES = int(os.environ.get('MAX_IMAGE_DOWNLOAD_BYTES', 15 * 1024 * 1024))
+# Home page search: 'auto' picks FTS5 on SQLite and tsvector on PostgreSQL; 'basic' = icontains
+MEMORIAL_SEARCH_BACKEND = os.environ.get('MEMORIAL_SEARCH_BACKEND', 'auto')
+# Best matches a home page search lists (its last page ends there)
+MEMORIAL_SEARCH_MAX_RESULTS = int(os.environ.get('MEMORIAL_SEARCH_MAX_RESULTS', 240))
+# Navbar profile type-ahead: 'auto' picks pg_trgm on PostgreSQL and an in-process prefix index elsewhere.
+# BUDGET_MS caps each lookup; the in-process index is rebuilt in the background after edits or MAX_AGE seconds.
+PROFILE_SEARCH_BACKEND = os.environ.get('PROFILE_SEARCH_BACKEND', 'auto')
+PROFILE_SEARCH_BUDGET_MS = int(os.environ.get('PROFILE_SEARCH_BUDGET_MS', 25))
+PROFILE_SEARCH_CACHE_TIMEOUT = int(os.environ.get('PROFILE_SEARCH_CACHE_TIMEOUT', 60))
+PROFILE_SEARCH_INDEX_MAX_AGE = int(os.environ.get('PROFILE_SEARCH_INDEX_MAX_AGE', 300))
+# Live candle/message push (ws/memorial/<pk>/). The in-process broker only reaches viewers
+# connected to the same ASGI worker; point this at a shared backend before scaling out.
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'memorials.realtime.InProcessBroker')
+# Longest a DM long-poll (users/dm/<username>/wait/) waits for a new message before answering empty;
+# keep it below the proxy's read timeout
+DM_LONG_POLL_TIMEOUT = float(os.environ.get('DM_LONG_POLL_TIMEOUT', 25))
+# Under WSGI the wait endpoint answers at once and asks clients to poll again after this many seconds
+DM_POLL_INTERVAL = float(os.environ.get('DM_POLL_INTERVAL', 3))
+# Multiplexed live feed (/live/): polls start every MIN seconds and stretch towards MAX
+# while the user's streams stay quiet or the tab is hidden
+LIVE_FEED_MIN_RETRY = int(os.environ.get('LIVE_FEED_MIN_RETRY', 2))
+LIVE_FEED_MAX_RETRY = int(os.environ.get('LIVE_FEED_MAX_RETRY', 30))
+# Buffered candle ingest for viral memorials: batches of BATCH_SIZE, written at least every
+# FLUSH_MS (= the most an unclean shutdown can lose); FLUSH_MS=0 writes through
+CANDLE_BUFFER_ENABLED = os.environ.get('CANDLE_BUFFER_ENABLED', 'False') == 'True'
+CANDLE_BUFFER_BATCH_SIZE = int(os.environ.get('CANDLE_BUFFER_BATCH_SIZE', 100))
+CANDLE_BUFFER_FLUSH_MS = int(os.environ.get('CANDLE_BUFFER_FLUSH_MS', 250))
+CANDLE_BUFFER_MAX_PENDING = int(os.environ.get('CANDLE_BUFFER_MAX_PENDING', 5000))
+# Cached memorial detail fragments. Writes invalidate them through Memorial.fragment_version,
+# which every process sees; the TTL only bounds how long unread entries linger
+MEMORIAL_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('MEMORIAL_FRAGMENT_CACHE_TIMEOUT', 300))
+# Stars in the precomputed home constellation (memorials/constellation.py)
+CONSTELLATION_MAX_STARS = int(os.environ.get('CONSTELLATION_MAX_STARS', 5000))
+# Seconds a built constellation is served before the next request rebuilds it
+CONSTELLATION_MAX_AGE = int(os.environ.get('CONSTELLATION_MAX_AGE', 900))
+# "On this day" anniversaries shown on the home page, and how long each day's list is cached (seconds)
+ANNIVERSARY_LIMIT = int(os.environ.get('ANNIVERSARY_LIMIT', 12))
+ANNIVERSARY_CACHE_TIMEOUT = int(os.environ.get('ANNIVERSARY_CACHE_TIMEOUT', 600))
+# Per-object reaction counts cached for list pages (seconds); a toggle drops its object's entry
+REACTION_SUMMARY_CACHE_TIMEOUT = int(os.environ.get('REACTION_SUMMARY_CACHE_TIMEOUT', 30))
 
 # Auth settings
 LOGIN_REDIRECT_URL = 'home'
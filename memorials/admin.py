@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Memorial, Message, Candle
+from .models import Memorial, Message, Candle, ImageGenerationJob
 
 @admin.register(Memorial)
 class MemorialAdmin(admin.ModelAdmin):
     list_display = ('name', 'creator', 'created_at')
     search_fields = ('name', 'biography', 'tribute')
-    list_filter = ('created_at', 'is_ai_generated_image')
+    list_filter = ('created_at', 'is_ai_generated_image', 'image_status')
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -18,3 +18,9 @@ class CandleAdmin(admin.ModelAdmin):
     list_display = ('lit_by', 'memorial', 'lit_at')
     search_fields = ('message', 'lit_by')
     list_filter = ('lit_at',)
+
+@admin.register(ImageGenerationJob)
+class ImageGenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('memorial', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('memorial__name', 'prompt', 'error')
@@ -0,0 +1,81 @@
+""""On this day": memorials whose birth or passing anniversary is today.
+
+Memorial.save() stores ``month * 100 + day`` of both dates in indexed
+columns, so the lookup is two index seeks instead of extracting the month
+and day from every row. The day's list is cached under its date and
+dropped whenever a memorial is saved or deleted.
+"""
+import calendar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Memorial, month_day
+
+KEY_PREFIX = 'anniversaries:'
+
+
+def _limit():
+    return getattr(settings, 'ANNIVERSARY_LIMIT', 12)
+
+
+def _timeout():
+    return getattr(settings, 'ANNIVERSARY_CACHE_TIMEOUT', 600)
+
+
+def calendar_keys(day):
+    """Month-day keys that fall on ``day``; Feb 29 is remembered on Feb 28 in common years"""
+    keys = [month_day(day)]
+    if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+        keys.append(229)
+    return keys
+
+
+def lookup(day):
+    """Uncached anniversary list for ``day``, most remembered first"""
+    keys = calendar_keys(day)
+    rows = (Memorial.objects
+            # Dates of today itself are not anniversaries yet; filtered here so the slice stays full
+            .filter(Q(birth_month_day__in=keys, date_of_birth__lt=day) |
+                    Q(passing_month_day__in=keys, date_of_passing__lt=day))
+            .order_by('-candle_count', '-message_count', 'pk')
+            .values('pk', 'public_id', 'name', 'date_of_birth', 'date_of_passing',
+                    'birth_month_day', 'passing_month_day')
+            [:_limit()])
+    results = []
+    for row in rows:
+        kinds = []
+        if row['birth_month_day'] in keys and row['date_of_birth'] < day:
+            kinds.append({'kind': 'birth', 'years': day.year - row['date_of_birth'].year})
+        if row['passing_month_day'] in keys and row['date_of_passing'] < day:
+            kinds.append({'kind': 'passing', 'years': day.year - row['date_of_passing'].year})
+        results.append({
+            'id': row['pk'],
+            'public_id': row['public_id'],
+            'name': row['name'],
+            'url': reverse('memorial_detail', args=[row['pk']]),
+            'anniversaries': kinds,
+        })
+    return results
+
+
+def today():
+    return timezone.localdate()
+
+
+def on_this_day(day=None):
+    """Cached anniversary list for ``day`` (default: today in TIME_ZONE)"""
+    day = day or today()
+    key = f'{KEY_PREFIX}{day.isoformat()}'
+    results = cache.get(key)
+    if results is None:
+        results = lookup(day)
+        cache.set(key, results, _timeout())
+    return results
+
+
+def invalidate(day=None):
+    cache.delete(f'{KEY_PREFIX}{(day or today()).isoformat()}')
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class MemorialsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'memorials'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""Write-coalescing ingest for candle lights.
+
+With ``CANDLE_BUFFER_ENABLED`` on, ``light_candle`` appends the candle to
+an in-process buffer and answers immediately; a background thread writes
+the buffer with one ``bulk_create`` per batch and updates each memorial's
+counters once per batch, instead of taking the database write lock per
+click. ``CANDLE_BUFFER_FLUSH_MS`` is the durability knob: it bounds how
+long an acknowledged candle lives only in memory (and so what a crash can
+lose); 0 writes through on every submit. ``CANDLE_BUFFER_MAX_PENDING``
+applies backpressure by flushing inline when the flusher falls behind.
+"""
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import fragment_cache
+from .counters import record_activity
+from .models import Candle, Memorial
+from .realtime import candle_payload, publish_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+def enabled():
+    return getattr(settings, 'CANDLE_BUFFER_ENABLED', False)
+
+
+class CandleBuffer:
+    def __init__(self, batch_size=100, flush_ms=250, max_pending=5000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.stats = {'submitted': 0, 'flushed': 0, 'batches': 0, 'dropped': 0, 'errors': 0}
+
+    def submit(self, candle):
+        """Queue an unsaved Candle; returns a reference echoed in its live event"""
+        ref = uuid.uuid4().hex
+        with self._lock:
+            self._pending.append((candle, ref))
+            self.stats['submitted'] += 1
+            size = len(self._pending)
+        if size >= self.max_pending or self.flush_interval <= 0:
+            self.flush()
+        elif size >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_flusher()
+        return ref
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='candle-buffer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self.flush() >= self.batch_size:
+                    pass
+            finally:
+                close_old_connections()
+
+    def _take(self):
+        with self._lock:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+        return batch
+
+    def flush(self):
+        """Write one batch; returns how many candles it took off the buffer (0 on error)"""
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+                return len(batch)
+            except Exception:
+                self.stats['errors'] += 1
+                logger.exception("Candle buffer flush failed; %d candle(s) requeued", len(batch))
+                with self._lock:
+                    room = max(0, self.max_pending - len(self._pending))
+                    self.stats['dropped'] += max(0, len(batch) - room)
+                    self._pending[:0] = batch[:room]
+                return 0
+
+    def flush_all(self):
+        while self.flush():
+            pass
+
+    def _write(self, batch):
+        # Memorials deleted since the click would fail the whole batch on the foreign key
+        live = set(Memorial.objects.filter(pk__in={c.memorial_id for c, _ref in batch}).values_list('pk', flat=True))
+        batch = [(c, ref) for c, ref in batch if c.memorial_id in live]
+        if not batch:
+            return
+        per_memorial = defaultdict(list)
+        with transaction.atomic():
+            Candle.objects.bulk_create([c for c, _ref in batch])
+            for candle, ref in batch:
+                per_memorial[candle.memorial_id].append((candle, ref))
+            for memorial_id, items in per_memorial.items():
+                record_activity(Memorial, memorial_id, candles=len(items),
+                                at=max(c.lit_at for c, _ref in items))
+                # bulk_create sends no post_save, so invalidate the cached candle grid here
+                fragment_cache.bump_on_commit(memorial_id)
+                for candle, ref in items:
+                    publish_on_commit(memorial_id, 'candle', {**candle_payload(candle), 'ref': ref})
+        self.stats['flushed'] += len(batch)
+        self.stats['batches'] += 1
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_buffer():
+    """The buffer for this process (a forked worker gets its own, with its own flusher)"""
+    pid = os.getpid()
+    if pid not in _buffers:
+        with _buffers_lock:
+            if pid not in _buffers:
+                buffer = CandleBuffer(
+                    batch_size=getattr(settings, 'CANDLE_BUFFER_BATCH_SIZE', 100),
+                    flush_ms=getattr(settings, 'CANDLE_BUFFER_FLUSH_MS', 250),
+                    max_pending=getattr(settings, 'CANDLE_BUFFER_MAX_PENDING', 5000),
+                )
+                # Graceful shutdowns (deploys, worker recycling) lose nothing
+                atexit.register(buffer.flush_all)
+                _buffers[pid] = buffer
+    return _buffers[pid]
@@ -0,0 +1,109 @@
+"""Precomputed star map for the home page constellation view.
+
+The memorial table is turned into one compact JSON document: a row per
+star with a stable position derived from the memorial id and a brightness
+from its candles and messages. The serialized bytes are stored with a
+content version in the durable cache (shared by every worker) for
+CONSTELLATION_MAX_AGE seconds and mirrored in the fast default cache, so
+the endpoint serves thousands of stars without touching the database.
+The first request after expiry rebuilds it; ``build_constellation`` can
+refresh it ahead of time.
+"""
+import hashlib
+import json
+import logging
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Memorial
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'constellation:v1'
+FIELDS = ('id', 'x', 'y', 'weight', 'name', 'years')
+FAST_CACHE_TIMEOUT = 60
+
+
+def _max_stars():
+    return getattr(settings, 'CONSTELLATION_MAX_STARS', 5000)
+
+
+def _position(pk):
+    # Stable across rebuilds so stars never jump around between visits
+    digest = hashlib.sha1(f'star:{pk}'.encode('ascii')).digest()
+    x = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+    y = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF
+    return round(0.05 + 0.9 * x, 4), round(0.05 + 0.9 * y, 4)
+
+
+def build_dataset():
+    """Return ``(version, body_bytes)`` for the most active memorials"""
+    rows = (Memorial.objects.order_by('-last_activity_at', '-created_at')
+            .values_list('pk', 'name', 'date_of_birth', 'date_of_passing', 'candle_count', 'message_count')
+            [:_max_stars()])
+    stars = []
+    peak = 1.0
+    for pk, name, born, passed, candles, messages in rows.iterator(chunk_size=1000):
+        activity = math.log1p(candles + 2 * messages)
+        peak = max(peak, activity)
+        years = f"{born.year} - {passed.year}" if born and passed else ''
+        stars.append([pk, *_position(pk), activity, name, years])
+    for star in stars:
+        star[3] = round(star[3] / peak, 3)
+    payload = {
+        'fields': FIELDS,
+        'url_template': reverse('memorial_detail', args=[0]).replace('/0/', '/{id}/'),
+        'generated_at': timezone.now().isoformat(),
+        'stars': stars,
+    }
+    # The version covers the stars only, so an unchanged sky keeps its ETag across rebuilds
+    version = hashlib.sha1(json.dumps(stars, separators=(',', ':')).encode('utf-8')).hexdigest()[:16]
+    payload['version'] = version
+    return version, json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _tiers():
+    tiers = [caches['default']]
+    try:
+        tiers.append(caches['ai_results'])
+    except InvalidCacheBackendError:
+        pass
+    return tiers
+
+
+def _max_age():
+    return getattr(settings, 'CONSTELLATION_MAX_AGE', 900)
+
+
+def publish():
+    """Rebuild the dataset and store it in every cache tier; returns the version"""
+    version, body = build_dataset()
+    fast, *durable = _tiers()
+    for backend in durable:
+        # Expiring, so the sky follows new activity without a scheduled job
+        backend.set(CACHE_KEY, (version, body), _max_age())
+    fast.set(CACHE_KEY, (version, body), FAST_CACHE_TIMEOUT)
+    return version, body
+
+
+def get_dataset():
+    """``(version, body_bytes)`` from cache, rebuilding it when missing or expired"""
+    fast, *durable = _tiers()
+    try:
+        cached = fast.get(CACHE_KEY)
+        if cached:
+            return cached
+        for backend in durable:
+            cached = backend.get(CACHE_KEY)
+            if cached:
+                fast.set(CACHE_KEY, cached, FAST_CACHE_TIMEOUT)
+                return cached
+        return publish()
+    except Exception as e:
+        logger.warning("Constellation cache unavailable, building inline: %s", e)
+        return build_dataset()
@@ -0,0 +1,54 @@
+"""Raw ASGI WebSocket handlers for live memorial pages (see routing.py)"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .models import Memorial
+from .realtime import get_broker, memorial_channel
+
+# Idle pings keep proxies (Render, nginx) from closing quiet sockets
+KEEPALIVE_SECONDS = 25
+
+
+@sync_to_async
+def _memorial_exists(pk):
+    close_old_connections()
+    try:
+        return Memorial.objects.filter(pk=pk).exists()
+    finally:
+        close_old_connections()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+
+async def memorial_updates(scope, receive, send, pk):
+    """Push candle/message events for one memorial until the client goes away"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if not await _memorial_exists(int(pk)):
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    subscription = get_broker().subscribe(memorial_channel(pk))
+    await send({'type': 'websocket.accept'})
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        while not disconnected.done():
+            next_event = asyncio.ensure_future(subscription.get(KEEPALIVE_SECONDS))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                break
+            event = next_event.result() or {'type': 'ping'}
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+    finally:
+        subscription.close()
+        disconnected.cancel()
@@ -0,0 +1,37 @@
+"""Maintenance of the denormalized Memorial.candle_count / message_count / last_activity_at"""
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def record_activity(memorial_model, memorial_id, candles=0, messages=0, at=None):
+    """Apply counter deltas with a single UPDATE so concurrent writers never lose increments"""
+    changes = {}
+    for field, delta in (('candle_count', candles), ('message_count', messages)):
+        if delta > 0:
+            changes[field] = F(field) + delta
+        elif delta < 0:
+            # Clamp at zero: a drifted counter must not trip the unsigned check constraint
+            changes[field] = Greatest(F(field) - (-delta), Value(0))
+    if at is not None:
+        # Only move forward; a late-arriving older event must not rewind the timestamp
+        changes['last_activity_at'] = Greatest(Coalesce(F('last_activity_at'), Value(at)), Value(at))
+    if changes:
+        memorial_model.objects.filter(pk=memorial_id).update(**changes)
+
+
+def reconcile_queryset(memorials, candle_model, message_model):
+    """Recompute all counters for ``memorials`` in one set-based UPDATE"""
+    def aggregate(model, expr, field):
+        return Subquery(
+            model.objects.filter(memorial=OuterRef('pk')).order_by()
+            .values('memorial').annotate(v=expr(field)).values('v')[:1]
+        )
+
+    last_candle = aggregate(candle_model, Max, 'lit_at')
+    last_message = aggregate(message_model, Max, 'created_at')
+    return memorials.update(
+        candle_count=Coalesce(aggregate(candle_model, Count, 'pk'), 0),
+        message_count=Coalesce(aggregate(message_model, Count, 'pk'), 0),
+        # GREATEST() is NULL-propagating on SQLite, so coalesce each side with the other
+        last_activity_at=Greatest(Coalesce(last_candle, last_message), Coalesce(last_message, last_candle)),
+    )
@@ -0,0 +1,41 @@
+"""Per-memorial version numbers for the cached fragments of the detail page.
+
+Fragments are cached under the memorial's current version, so a write only
+has to replace the version and every stale fragment stops being read; old
+entries simply expire. The version is a column on Memorial: the detail page
+has the row loaded anyway, and every process (web workers, the image job
+runner) sees the same value, which a version in the per-process LocMem
+default cache would not. New versions come from the clock rather than an
+increment, so a full save() writing back an older value can never revive
+fragments cached under a version that is handed out again.
+"""
+import logging
+import time
+
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _fresh():
+    return time.time_ns() // 1000
+
+
+def version(memorial):
+    return memorial.fragment_version
+
+
+def bump_many(memorial_ids):
+    from .models import Memorial
+    try:
+        Memorial.objects.filter(pk__in=list(memorial_ids)).update(fragment_version=_fresh())
+    except DatabaseError as e:
+        logger.warning("Fragment version bump failed for memorials %s: %s", list(memorial_ids), e)
+
+
+def bump(memorial_id):
+    bump_many([memorial_id])
+
+
+def bump_on_commit(memorial_id):
+    transaction.on_commit(lambda: bump(memorial_id))
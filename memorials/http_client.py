@@ -0,0 +1,288 @@
+"""Shared outbound HTTP layer for the AI integrations (Groq, AI Horde, image downloads).
+
+Each named client keeps one pooled ``requests.Session`` per process so
+keep-alive connections are reused across calls, retries transient failures
+with jittered exponential backoff inside an overall deadline, and trips a
+circuit breaker when the upstream keeps failing so requests fail fast
+instead of tying up web workers.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while a client's breaker is open"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an operation has used up its time budget"""
+
+
+class Deadline:
+    """Time budget shared by every request (and sleep) of one logical operation"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def timeout(self, cap):
+        """Clamp a per-request timeout so it never outlives the deadline"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Operation exceeded its {self.seconds}s budget")
+        if isinstance(cap, tuple):
+            return tuple(min(c, remaining) for c in cap)
+        return min(cap, remaining)
+
+    def sleep(self, seconds):
+        remaining = self.remaining()
+        if seconds >= remaining:
+            raise DeadlineExceeded(f"Operation exceeded its {self.seconds}s budget")
+        time.sleep(seconds)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                # Let a single probe through; its outcome decides the next state
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ClientMetrics:
+    """Per-process counters; read with HTTPClient.stats()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.circuit_rejections = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency, new_connection, error=False):
+        with self._lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if error:
+                self.errors += 1
+            if new_connection is True:
+                self.new_connections += 1
+            elif new_connection is False:
+                self.reused_connections += 1
+
+    def incr(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            connections = self.new_connections + self.reused_connections
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'circuit_rejections': self.circuit_rejections,
+                'new_connections': self.new_connections,
+                'reused_connections': self.reused_connections,
+                'reuse_ratio': round(self.reused_connections / connections, 3) if connections else None,
+                'latency_avg_ms': round(self.latency_total / self.requests * 1000, 1) if self.requests else None,
+                'latency_max_ms': round(self.latency_max * 1000, 1),
+            }
+
+
+class HTTPClient:
+    def __init__(self, name, pool_connections=2, pool_maxsize=10, max_retries=2,
+                 backoff_base=0.5, backoff_cap=8.0, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = ClientMetrics()
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Sessions must not be shared across a fork (e.g. gunicorn --preload)
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                          pool_maxsize=self.pool_maxsize, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def _pool_connections(self, url):
+        # urllib3 counts sockets opened per host pool; a delta means a new connection
+        try:
+            adapter = self.session.get_adapter(url)
+            pool = adapter.poolmanager.connection_from_url(url)
+            return pool.num_connections
+        except Exception:
+            return None
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_cap)
+        # "Full jitter" exponential backoff
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, url, timeout=20, deadline=None, retries=None, **kwargs):
+        """Send a request through the pooled session.
+
+        Transient failures (connection errors, timeouts, 429/5xx) are retried
+        with jittered backoff; non-idempotent methods are only retried when the
+        request never reached the server or was explicitly throttled. Raises
+        CircuitOpenError / DeadlineExceeded instead of waiting on a dead host.
+        """
+        method = method.upper()
+        retries = self.max_retries if retries is None else retries
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            # Before allow(): a spent deadline must not leave a half-open trial claimed forever
+            request_timeout = deadline.timeout(timeout) if deadline else timeout
+            if not self.breaker.allow():
+                self.metrics.incr('circuit_rejections')
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+            before = self._pool_connections(url)
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = self.session.request(method, url, timeout=request_timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            latency = time.monotonic() - started
+            after = self._pool_connections(url)
+            new_connection = None if before is None or after is None else after > before
+
+            failed = error is not None or response.status_code >= 500
+            self.metrics.record(latency, new_connection, error=failed)
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if error is None and response.status_code not in RETRY_STATUSES:
+                return response
+
+            retryable = (
+                isinstance(error, requests.ConnectionError)
+                or (response is not None and response.status_code == 429)
+                or idempotent
+            )
+            if attempt >= retries or not retryable:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            attempt += 1
+            self.metrics.incr('retries')
+            logger.info("Retrying %s %s (%s) in %.2fs", method, url,
+                        error or response.status_code, delay)
+            if deadline:
+                deadline.sleep(delay)
+            else:
+                time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        data = self.metrics.snapshot()
+        data['circuit'] = self.breaker.state
+        return data
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """Return the process-wide client for an upstream, creating it on first use"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = HTTPClient(name, **options)
+    return client
+
+
+def client_stats():
+    return {name: client.stats() for name, client in sorted(_clients.items())}
@@ -0,0 +1,101 @@
+"""Sized WebP/JPEG derivatives of memorial images for responsive srcset markup.
+
+AI images arrive upscaled to ~3072px and uploads are stored as-is, so list
+pages would otherwise download megabytes per card. Each variant is
+EXIF-stripped (after applying the orientation), progressive where the
+format supports it, and stored next to the original under
+``memorial_images/variants/``.
+"""
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import fragment_cache
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024)
+VARIANT_FORMATS = (
+    # key, Pillow format, save options
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+VARIANT_DIR = 'memorial_images/variants'
+
+
+def variants_current(memorial):
+    """True when the stored variants were built from the memorial's current image"""
+    source = (memorial.image_variants or {}).get('source', '')
+    return source == (memorial.image.name or '')
+
+
+def render_variants(image_name, storage=default_storage):
+    """Build every variant for a stored image and return the variant manifest.
+
+    Pure with respect to the database so it can run in a worker process.
+    """
+    with storage.open(image_name, 'rb') as fh:
+        with Image.open(fh) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'L'):
+                # Flatten transparency onto white so JPEG output looks like the source
+                background = Image.new('RGB', original.size, (255, 255, 255))
+                rgba = original.convert('RGBA')
+                background.paste(rgba, mask=rgba.split()[-1])
+                original = background
+            else:
+                original = original.convert('RGB')
+
+            widths = [w for w in VARIANT_WIDTHS if w < original.width] or [original.width]
+            stem = posixpath.splitext(posixpath.basename(image_name))[0]
+            manifest = {'source': image_name, 'widths': widths}
+            for key, fmt, options in VARIANT_FORMATS:
+                manifest[key] = {}
+                for width in widths:
+                    height = max(1, round(original.height * width / original.width))
+                    resized = original.resize((width, height), Image.LANCZOS)
+                    buf = io.BytesIO()
+                    resized.save(buf, fmt, **options)
+                    name = storage.save(f"{VARIANT_DIR}/{stem}-{width}.{key}", ContentFile(buf.getvalue()))
+                    manifest[key][str(width)] = name
+    return manifest
+
+
+def delete_variants(manifest, storage=default_storage):
+    for key, _fmt, _options in VARIANT_FORMATS:
+        for name in (manifest or {}).get(key, {}).values():
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.warning("Could not delete image variant %s", name)
+
+
+def build_variants(memorial):
+    """(Re)build variants for a memorial's current image and persist the manifest"""
+    from .models import Memorial
+
+    old = memorial.image_variants or {}
+    manifest = {}
+    if memorial.image:
+        try:
+            manifest = render_variants(memorial.image.name)
+        except Exception as e:
+            logger.warning("Could not build variants for memorial %s: %s", memorial.pk, e)
+            manifest = {'source': memorial.image.name, 'error': str(e)}
+    delete_variants(old)
+    Memorial.objects.filter(pk=memorial.pk).update(image_variants=manifest)
+    fragment_cache.bump(memorial.pk)
+    memorial.image_variants = manifest
+    return manifest
+
+
+def srcset(manifest, key, storage=default_storage):
+    entries = (manifest or {}).get(key) or {}
+    return ', '.join(
+        f"{storage.url(name)} {width}w"
+        for width, name in sorted(entries.items(), key=lambda item: int(item[0]))
+    )
@@ -0,0 +1,131 @@
+"""Bounded ingest of remote/AI image payloads into storage.
+
+Payloads are written chunk by chunk into a spooled temp file (kept in
+memory only while small), capped at MAX_IMAGE_BYTES and a total deadline,
+and typed by their magic bytes instead of the Content-Type header. The
+spooled file is handed straight to the storage backend, so no second
+in-memory copy of the image is made.
+"""
+import base64
+import binascii
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+from .http_client import Deadline, DeadlineExceeded, get_client
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MEMORY_LIMIT = 1024 * 1024
+
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+class ImageIngestError(Exception):
+    pass
+
+
+def _max_bytes():
+    return getattr(settings, 'MAX_IMAGE_DOWNLOAD_BYTES', 15 * 1024 * 1024)
+
+
+def sniff_image_type(head):
+    """Return a file extension for the image format in ``head``, or None"""
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class _SpoolWriter:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b''
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.file.close()
+            raise ImageIngestError(f"Image exceeds the {self.max_bytes} byte limit")
+        if len(self.head) < 16:
+            self.head += chunk[:16 - len(self.head)]
+        self.file.write(chunk)
+
+    def finish(self):
+        ext = sniff_image_type(self.head)
+        if ext is None:
+            self.file.close()
+            raise ImageIngestError("Payload is not a PNG, JPEG, GIF or WebP image")
+        self.file.seek(0)
+        return File(self.file), ext
+
+
+def spool_from_url(url, max_bytes=None, timeout_seconds=60):
+    """Stream a remote image into a spooled file; returns (File, ext)"""
+    max_bytes = max_bytes or _max_bytes()
+    deadline = Deadline(timeout_seconds)
+    resp = get_client('image-download').get(url, timeout=(5, 20), deadline=deadline, stream=True)
+    with resp:
+        resp.raise_for_status()
+        declared = resp.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise ImageIngestError(f"Image exceeds the {max_bytes} byte limit")
+        writer = _SpoolWriter(max_bytes)
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if deadline.remaining() <= 0:
+                writer.file.close()
+                raise DeadlineExceeded(f"Image download exceeded {timeout_seconds}s")
+            writer.write(chunk)
+    return writer.finish()
+
+
+def spool_from_base64(data, max_bytes=None):
+    """Decode a (possibly data-URL) base64 image incrementally; returns (File, ext)"""
+    max_bytes = max_bytes or _max_bytes()
+    if data.startswith('data:'):
+        data = data.partition(',')[2]
+    if len(data) * 3 // 4 > max_bytes + 3:
+        raise ImageIngestError(f"Image exceeds the {max_bytes} byte limit")
+    writer = _SpoolWriter(max_bytes)
+    step = CHUNK_SIZE // 3 * 4  # whole base64 quanta per slice
+    try:
+        for start in range(0, len(data), step):
+            writer.write(base64.b64decode(data[start:start + step], validate=True))
+    except (binascii.Error, ValueError) as e:
+        writer.file.close()
+        raise ImageIngestError(f"Invalid base64 image data: {e}")
+    return writer.finish()
+
+
+def spool_from_bytes(data, max_bytes=None):
+    writer = _SpoolWriter(max_bytes or _max_bytes())
+    writer.write(bytes(data))
+    return writer.finish()
+
+
+def attach_image(memorial, payload, filename_prefix='ai_memorial'):
+    """Store an AI result (bytes, URL or base64) as the memorial image without saving the row"""
+    if isinstance(payload, (bytes, bytearray)):
+        fileobj, ext = spool_from_bytes(payload)
+    elif isinstance(payload, str) and payload.startswith(('http://', 'https://')):
+        fileobj, ext = spool_from_url(payload)
+    elif isinstance(payload, str):
+        fileobj, ext = spool_from_base64(payload.strip())
+    else:
+        raise ImageIngestError("Unsupported image payload")
+    image_name = f"{filename_prefix}_{memorial.name.replace(' ', '_')}.{ext}"
+    with fileobj:
+        memorial.image.save(image_name, fileobj, save=False)
+    memorial.is_ai_generated_image = True
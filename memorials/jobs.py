@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import fragment_cache
+from .models import Memorial, ImageGenerationJob
+from .ingest import attach_image
+from .services import AIHordeService
+
+logger = logging.getLogger(__name__)
+
+# A job stuck in "running" longer than this is assumed to belong to a dead worker
+STALE_JOB_AFTER = timedelta(minutes=10)
+
+
+def _max_attempts():
+    return getattr(settings, 'IMAGE_JOB_MAX_ATTEMPTS', 2)
+
+
+def save_image_payload(memorial, image_payload):
+    """Attach an AI Horde result (raw bytes, URL or base64) to the memorial without saving it"""
+    if not image_payload:
+        return False, "AI image service did not return an image."
+    try:
+        attach_image(memorial, image_payload)
+    except Exception as e:
+        logger.warning("Could not store generated image for memorial %s: %s", memorial.pk, e)
+        return False, f"Could not store generated image. {e}"
+    return True, None
+
+
+def enqueue_image_job(memorial, prompt):
+    """Mark the memorial as waiting for an image and queue the generation"""
+    with transaction.atomic():
+        Memorial.objects.filter(pk=memorial.pk).update(image_status='pending')
+        memorial.image_status = 'pending'
+        fragment_cache.bump_on_commit(memorial.pk)
+        return ImageGenerationJob.objects.create(memorial=memorial, prompt=prompt)
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to running; None when the queue is empty"""
+    candidates = (ImageGenerationJob.objects.filter(status='pending')
+                  .order_by('created_at').values_list('pk', flat=True)[:5])
+    for pk in list(candidates):
+        # Conditional update so two workers never claim the same job
+        claimed = ImageGenerationJob.objects.filter(pk=pk, status='pending').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ImageGenerationJob.objects.select_related('memorial').get(pk=pk)
+    return None
+
+
+def requeue_stale_jobs():
+    """Recover jobs left running by a worker that died mid-generation"""
+    cutoff = timezone.now() - STALE_JOB_AFTER
+    stale = ImageGenerationJob.objects.filter(status='running', started_at__lt=cutoff)
+    retried = stale.filter(attempts__lt=_max_attempts()).update(status='pending')
+    for job in stale.select_related('memorial'):
+        _fail(job, "Worker stopped before the image was generated.")
+    return retried
+
+
+def _fail(job, error):
+    job.status = 'failed'
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    Memorial.objects.filter(pk=job.memorial_id).update(image_status='failed')
+    fragment_cache.bump(job.memorial_id)
+
+
+def run_job(job):
+    """Generate and attach the image for a claimed job; returns True on success"""
+    memorial = job.memorial
+    try:
+        image_payload = AIHordeService.generate_memorial_image(job.prompt)
+        ok, err = save_image_payload(memorial, image_payload)
+    except Exception as e:
+        logger.exception("Image job %s failed: %s", job.pk, e)
+        ok, err = False, str(e)
+
+    if not ok:
+        if job.attempts < _max_attempts():
+            job.status = 'pending'
+            job.error = err or ''
+            job.save(update_fields=['status', 'error'])
+        else:
+            _fail(job, err or "Unknown error")
+        return False
+
+    memorial.image_status = 'ready'
+    try:
+        memorial.save(update_fields=['image', 'is_ai_generated_image', 'image_status', 'updated_at'])
+    except DatabaseError:
+        # update_fields raises when no row matched: the memorial (and this job, by cascade) was deleted meanwhile
+        if Memorial.objects.filter(pk=memorial.pk).exists():
+            raise
+        logger.info("Memorial %s was deleted while job %s ran; discarding its image", memorial.pk, job.pk)
+        memorial.image.delete(save=False)
+        return False
+    job.status = 'done'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return True
@@ -0,0 +1,152 @@
+"""One polling endpoint for every live surface open on a page.
+
+Instead of a poller per DM thread, community channel and guestbook, the
+page registers its streams with ``/live/?s=<kind>:<key>:<after>`` and a
+single request returns whatever is new in all of them. Cursors are
+message ids, so rows sharing a timestamp are never skipped. Each kind is
+answered with a fixed number of queries however many of its streams are
+open, and ``retry_after`` tells the client when to poll next, backing off
+while nothing happens. In the browser one tab polls on behalf of all of a
+user's open tabs (static/js/livefeed.js).
+"""
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from communities.models import Channel, CommunityMessage, Membership
+from users.models import Conversation, DirectMessage
+
+from .models import Memorial, Message
+from .realtime import message_payload
+
+MAX_STREAMS = 20
+# Per kind and response; the client is told to come straight back when there are more
+MAX_EVENTS = 100
+
+
+class InvalidStream(ValueError):
+    pass
+
+
+def parse_streams(values):
+    """``['dm:bob:12', 'channel:3:40']`` -> ``{'dm': {'bob': 12}, 'channel': {'3': 40}}``"""
+    if len(values) > MAX_STREAMS:
+        raise InvalidStream(f"At most {MAX_STREAMS} streams per request")
+    streams = {}
+    for value in values:
+        try:
+            name, after = value.rsplit(':', 1)
+            kind, key = name.split(':', 1)
+            after = int(after)
+        except ValueError:
+            raise InvalidStream(f"Invalid stream {value!r}")
+        if kind not in SOURCES or after < 0:
+            raise InvalidStream(f"Invalid stream {value!r}")
+        streams.setdefault(kind, {})[key] = after
+    return streams
+
+
+def _newer(queryset, parent_field, cursors):
+    """Rows past each ``{parent_id: after}`` cursor, oldest first, in one query; plus whether more remain"""
+    if not cursors:
+        return [], False
+    condition = reduce(or_, (Q(**{parent_field: parent_id, 'pk__gt': after}) for parent_id, after in cursors.items()))
+    rows = list(queryset.filter(condition).order_by('pk')[:MAX_EVENTS + 1])
+    return rows[:MAX_EVENTS], len(rows) > MAX_EVENTS
+
+
+def _numeric(cursors):
+    return {int(key): key for key in cursors if key.isdigit()}
+
+
+def dm_events(user, cursors):
+    """DM threads keyed by the other user's username; delivered messages are marked read"""
+    if not user.is_authenticated:
+        return {}, set(cursors), False
+    peers = dict(User.objects.filter(username__in=cursors).exclude(pk=user.pk).values_list('pk', 'username'))
+    names = {Conversation.pair(user, pk): name for pk, name in peers.items()}
+    conversations = {}
+    if names:
+        pairs = reduce(or_, (Q(user_a_id=a, user_b_id=b) for a, b in names))
+        conversations = {c.pk: c for c in Conversation.objects.filter(pairs)}
+    rows, more = _newer(DirectMessage.objects.select_related('sender'), 'conversation_id', {
+        pk: cursors[names[c.user_a_id, c.user_b_id]] for pk, c in conversations.items()
+    })
+    events = {}
+    unread = set()
+    for message in rows:
+        conversation = conversations[message.conversation_id]
+        events.setdefault(names[conversation.user_a_id, conversation.user_b_id], []).append(message.as_dict())
+        if message.receiver_id == user.pk and not message.is_read:
+            unread.add(conversation)
+    # Read markers are only written for threads that just delivered something unread
+    for conversation in unread:
+        conversation.mark_read(user)
+    return events, set(cursors) - set(peers.values()), more
+
+
+def channel_events(user, cursors):
+    """Community channels keyed by channel id, with the same visibility rule as messages_feed"""
+    ids = _numeric(cursors)
+    channels = list(Channel.objects.filter(pk__in=ids).values_list('pk', 'community_id', 'community__is_public'))
+    private = {community_id for _pk, community_id, public in channels if not public}
+    joined = set()
+    if private and user.is_authenticated:
+        joined = set(Membership.objects.filter(user=user, community_id__in=private).values_list('community_id', flat=True))
+    allowed = {pk for pk, community_id, public in channels if public or community_id in joined}
+    rows, more = _newer(CommunityMessage.objects.select_related('author'), 'channel_id',
+                        {pk: cursors[ids[pk]] for pk in allowed})
+    events = {}
+    for message in rows:
+        events.setdefault(ids[message.channel_id], []).append(message.as_dict())
+    return events, set(cursors) - {ids[pk] for pk in allowed}, more
+
+
+def guestbook_events(user, cursors):
+    """Memorial guestbook messages keyed by memorial id"""
+    ids = _numeric(cursors)
+    found = set(Memorial.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    rows, more = _newer(Message.objects.all(), 'memorial_id', {pk: cursors[ids[pk]] for pk in found})
+    events = {}
+    for message in rows:
+        events.setdefault(ids[message.memorial_id], []).append(message_payload(message))
+    return events, set(cursors) - {ids[pk] for pk in found}, more
+
+
+SOURCES = {
+    'dm': dm_events,
+    'channel': channel_events,
+    'guestbook': guestbook_events,
+}
+
+
+def retry_after(quiet, hidden=False):
+    """Seconds before the next poll, after ``quiet`` consecutive responses without events"""
+    low = getattr(settings, 'LIVE_FEED_MIN_RETRY', 2)
+    high = getattr(settings, 'LIVE_FEED_MAX_RETRY', 30)
+    if hidden:
+        return high
+    return round(min(high, low * 1.5 ** min(quiet, 20)))
+
+
+def collect(user, streams, quiet=0, hidden=False):
+    """The live feed response for parsed ``streams`` (see parse_streams)"""
+    results = {}
+    denied = []
+    backlog = False
+    for kind, cursors in streams.items():
+        events, missing, more = SOURCES[kind](user, cursors)
+        backlog = backlog or more
+        for key, items in events.items():
+            results[f'{kind}:{key}'] = {'events': items, 'cursor': items[-1]['id']}
+        denied += sorted(f'{kind}:{key}' for key in missing)
+    quiet = 0 if results else quiet + 1
+    return {
+        'streams': results,
+        'denied': denied,
+        'quiet': quiet,
+        'retry_after': 0 if backlog else retry_after(quiet, hidden),
+    }
@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections, transaction
+
+from memorials.candle_buffer import CandleBuffer
+from memorials.models import Candle, Memorial
+
+
+class Command(BaseCommand):
+    help = ("Measure candle writes/sec for direct INSERTs vs the write-coalescing buffer. "
+            "Creates (and removes) a scratch memorial; point DATABASE_URL at a throwaway database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000, help="Candles per mode")
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent writers (simulated requests)")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--flush-ms', type=int, default=250)
+        parser.add_argument('--mode', choices=('direct', 'buffered', 'both'), default='both')
+
+    def handle(self, *args, **options):
+        creator = User.objects.order_by('pk').first()
+        if creator is None:
+            raise CommandError("Create at least one user first (the scratch memorial needs a creator)")
+        memorial = Memorial.objects.create(creator=creator, name='Candle benchmark', biography='-')
+        try:
+            modes = ('direct', 'buffered') if options['mode'] == 'both' else (options['mode'],)
+            for mode in modes:
+                Candle.objects.filter(memorial=memorial).delete()
+                Memorial.objects.filter(pk=memorial.pk).update(candle_count=0)
+                elapsed, errors = getattr(self, f'_run_{mode}')(memorial, options)
+                stored = Candle.objects.filter(memorial=memorial).count()
+                memorial.refresh_from_db(fields=['candle_count'])
+                self.stdout.write(
+                    f"{mode:>8}: {stored} candles in {elapsed:.2f}s = {stored / elapsed:,.0f} writes/s "
+                    f"({errors} errors, candle_count={memorial.candle_count})"
+                )
+        finally:
+            memorial.delete()
+
+    def _parallel(self, options, work):
+        errors = []
+
+        def worker(i):
+            try:
+                work(i)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        # Each thread gets its own connection, like concurrent requests would
+        connections.close_all()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(worker, range(options['count'])))
+        return started, errors
+
+    def _run_direct(self, memorial, options):
+        def light(i):
+            with transaction.atomic():
+                Candle.objects.create(memorial_id=memorial.pk, lit_by=f'bench {i}')
+
+        started, errors = self._parallel(options, light)
+        return time.perf_counter() - started, len(errors)
+
+    def _run_buffered(self, memorial, options):
+        buffer = CandleBuffer(batch_size=options['batch_size'], flush_ms=options['flush_ms'],
+                              max_pending=max(options['count'], 1))
+
+        started, errors = self._parallel(
+            options, lambda i: buffer.submit(Candle(memorial_id=memorial.pk, lit_by=f'bench {i}')))
+        # Count until everything is durable, not just acknowledged
+        buffer.flush_all()
+        return time.perf_counter() - started, len(errors) + buffer.stats['errors']
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from memorials.constellation import publish
+
+
+class Command(BaseCommand):
+    help = "Precompute the home page constellation dataset into the shared cache ahead of its expiry"
+
+    def handle(self, *args, **options):
+        version, body = publish()
+        self.stdout.write(self.style.SUCCESS(f"Published constellation {version} ({len(body):,} bytes)"))
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from memorials import fragment_cache
+from memorials.images import delete_variants, render_variants
+from memorials.models import Memorial
+
+
+def _init_worker():
+    # Spawned workers (Windows/macOS) start without Django configured
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eternal_memories.settings')
+        django.setup()
+
+
+def _render(pk, image_name):
+    try:
+        return pk, render_variants(image_name), None
+    except Exception as e:
+        return pk, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Generate responsive WebP/JPEG variants for existing memorial images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                            help="Size of the process pool")
+        parser.add_argument('--force', action='store_true',
+                            help="Rebuild variants even when they are up to date")
+
+    def handle(self, *args, **options):
+        rows = Memorial.objects.exclude(image='').exclude(image__isnull=True) \
+            .values_list('pk', 'image', 'image_variants')
+        todo = [
+            (pk, image, variants or {}) for pk, image, variants in rows.iterator()
+            if options['force'] or (variants or {}).get('source') != image
+        ]
+        if not todo:
+            self.stdout.write("All memorial images already have variants")
+            return
+
+        self.stdout.write(f"Building variants for {len(todo)} image(s) with {options['workers']} worker(s)")
+        old_variants = {pk: variants for pk, _image, variants in todo}
+        # Never hand open DB connections to forked children
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            futures = [pool.submit(_render, pk, image) for pk, image, _variants in todo]
+            # Results are written by the parent only, keeping SQLite to a single writer
+            for future in as_completed(futures):
+                pk, manifest, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"Memorial {pk}: {error}")
+                    continue
+                delete_variants(old_variants[pk])
+                Memorial.objects.filter(pk=pk).update(image_variants=manifest)
+                fragment_cache.bump(pk)
+                done += 1
+                if done % 50 == 0:
+                    self.stdout.write(f"  {done}/{len(todo)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {done} image(s), {failed} failed"))
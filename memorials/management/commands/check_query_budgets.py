@@ -0,0 +1,128 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from communities.models import Community
+from memorials.models import Memorial
+from tales.models import Tale
+from users.models import DirectMessage
+
+# (name, url builder, max queries, max median milliseconds, needs a logged-in user)
+# Query budgets are for a cold cache; an N+1 regression blows them long before latency does
+BUDGETS = (
+    ('home', lambda s: reverse('home'), 12, 400, True),
+    ('home_anonymous', lambda s: reverse('home'), 8, 400, False),
+    ('home_offset_page', lambda s: reverse('home') + '?page=2', 13, 400, True),
+    ('home_search', lambda s: reverse('home') + f"?search={s['search']}", 13, 500, False),
+    ('memorials_feed', lambda s: reverse('memorials_feed'), 10, 300, True),
+    ('memorial_detail', lambda s: reverse('memorial_detail', args=[s['memorial'].pk]), 10, 400, True),
+    ('memorial_messages', lambda s: reverse('memorial_messages', args=[s['memorial'].pk]), 4, 200, False),
+    ('memorial_candles', lambda s: reverse('memorial_candles', args=[s['memorial'].pk]), 4, 200, False),
+    ('constellation', lambda s: reverse('constellation_data'), 8, 1000, False),
+    ('on_this_day', lambda s: reverse('on_this_day'), 2, 200, False),
+    ('tale_list', lambda s: reverse('tales:list'), 8, 400, True),
+    ('tale_detail', lambda s: reverse('tales:detail', kwargs={'slug': s['tale'].slug}), 10, 300, True),
+    ('community_list', lambda s: reverse('communities:list'), 6, 300, True),
+    ('community_detail', lambda s: reverse('communities:detail', kwargs={'slug': s['community'].slug}), 10, 300, True),
+    ('profile', lambda s: reverse('profile', kwargs={'username': s['user'].username}), 10, 400, True),
+    ('inbox', lambda s: reverse('inbox'), 4, 200, True),
+    ('unread_count', lambda s: reverse('unread_count'), 3, 100, True),
+    ('dm_thread', lambda s: reverse('dm_thread', kwargs={'username': s['peer'].username}), 10, 300, True),
+    ('dm_feed', lambda s: reverse('dm_feed', kwargs={'username': s['peer'].username}), 8, 300, True),
+    ('dm_wait', lambda s: reverse('dm_wait', kwargs={'username': s['peer'].username}) + '?timeout=0', 6, 300, True),
+    ('community_feed', lambda s: reverse('communities:messages_feed', kwargs={
+        'slug': s['community'].slug, 'channel_slug': s['channel'].slug}), 9, 300, True),
+    ('live_feed', lambda s: reverse('live_feed') + f"?s=dm:{s['peer'].username}:0&s=channel:{s['channel'].pk}:0"
+                                                  f"&s=guestbook:{s['memorial'].pk}:0", 12, 300, True),
+    ('search_profiles', lambda s: reverse('search_profiles') + f"?q={s['user'].username[:3]}", 3, 50, False),
+    ('reaction_summaries', lambda s: reverse('reaction_summaries') + f"?memorial={s['memorial_ids']}", 6, 200, True),
+)
+
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class Command(BaseCommand):
+    help = ("Request each major page against the current database (see seed_load_dataset) and fail "
+            "if any exceeds its query or latency budget. Clears the default cache: use on dev/CI databases.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Requests per page; latency is the median")
+        parser.add_argument('--latency-factor', type=float, default=1.0,
+                            help="Scale every latency budget (e.g. 3 on slow CI machines, 0 to skip latency checks)")
+        parser.add_argument('--only', nargs='*', default=(), help="Check only these pages")
+
+    def samples(self):
+        memorial = Memorial.objects.order_by('-candle_count', 'pk').first()
+        tale = Tale.objects.filter(is_public=True).annotate(n=Count('chapters')).order_by('-n', 'pk').first()
+        community = Community.objects.filter(is_public=True).annotate(n=Count('channels__messages')).order_by('-n', 'pk').first()
+        dm = DirectMessage.objects.values('sender', 'receiver').annotate(n=Count('pk')).order_by('-n').first()
+        if not (memorial and tale and community and dm):
+            raise CommandError("Not enough data to exercise every page; run seed_load_dataset first")
+        user = User.objects.get(pk=dm['sender'])
+        return {
+            'memorial': memorial,
+            'tale': tale,
+            'community': community,
+            'channel': community.channels.order_by('name').first(),
+            'user': user,
+            'peer': User.objects.get(pk=dm['receiver']),
+            'search': memorial.name.split()[0],
+            'memorial_ids': ','.join(str(pk) for pk in Memorial.objects.order_by('-created_at').values_list('pk', flat=True)[:12]),
+        }
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()
+            standalone = True
+        except RuntimeError:
+            # Already inside the test runner (memorials.tests), which owns the test environment
+            standalone = False
+        try:
+            failures = self.check_budgets(options)
+        finally:
+            if standalone:
+                teardown_test_environment()
+        if failures:
+            raise CommandError(f"{len(failures)} page(s) over budget: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All pages within budget"))
+
+    def check_budgets(self, options):
+        samples = self.samples()
+        anonymous = Client()
+        logged_in = Client()
+        logged_in.force_login(samples['user'])
+        failures = []
+        self.stdout.write(f"{'page':<22}{'queries':>12}{'median ms':>16}")
+        for name, url_for, max_queries, max_ms, needs_login in BUDGETS:
+            if options['only'] and name not in options['only']:
+                continue
+            client = logged_in if needs_login else anonymous
+            url = url_for(samples)
+            queries, timings = 0, []
+            for _ in range(max(1, options['repeat'])):
+                cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{name}: GET {url} returned {response.status_code}")
+                # Savepoints only show up under the test runner's wrapping transaction; BEGIN/COMMIT never do
+                statements = [q for q in captured.captured_queries if not q['sql'].startswith(TRANSACTION_CONTROL)]
+                queries = max(queries, len(statements))
+            median = statistics.median(timings)
+            latency_budget = max_ms * options['latency_factor']
+            over = queries > max_queries or (latency_budget and median > latency_budget)
+            line = f"{name:<22}{queries:>6} / {max_queries:<5}{median:>9.0f} / {latency_budget:<6.0f}"
+            self.stdout.write(self.style.ERROR(line) if over else line)
+            if over:
+                failures.append(name)
+        return failures
@@ -0,0 +1,68 @@
+import base64
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from memorials.models import Candle, Memorial, Message
+from memorials.transfer import (
+    CANDLE_FIELDS, FORMAT, DumpEncoder, MEMORIAL_FIELDS, MESSAGE_FIELDS, VERSION, open_stream,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream memorials, guestbook messages and candles to an NDJSON file (constant memory)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-',
+                            help="Destination file ('-' for stdout, '.gz' to compress)")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per database round trip")
+        parser.add_argument('--include-images', action='store_true',
+                            help="Embed image files as base64 so the dump is self-contained")
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.started = time.monotonic()
+        self.written = 0
+        stream = open_stream(options['output'], 'w')
+        try:
+            self._write(stream, {
+                'type': 'header', 'format': FORMAT, 'version': VERSION,
+                'exported_at': timezone.now(), 'images': options['include_images'],
+            })
+            self._export_memorials(stream, options['include_images'])
+            self._export_rows(stream, 'message', Message, MESSAGE_FIELDS)
+            self._export_rows(stream, 'candle', Candle, CANDLE_FIELDS)
+        finally:
+            if options['output'] != '-':
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(f"Exported {self.written:,} rows in {time.monotonic() - self.started:.1f}s"))
+
+    def _write(self, stream, record):
+        stream.write(json.dumps(record, cls=DumpEncoder, separators=(',', ':')))
+        stream.write('\n')
+        self.written += 1
+        if self.written % 10000 == 0:
+            # Progress goes to stderr so stdout can carry the dump itself
+            rate = self.written / max(time.monotonic() - self.started, 0.001)
+            self.stderr.write(f"  {self.written:,} rows ({rate:,.0f}/s)")
+
+    def _export_memorials(self, stream, include_images):
+        storage = Memorial._meta.get_field('image').storage
+        rows = Memorial.objects.order_by('pk').values(*MEMORIAL_FIELDS, 'creator__username')
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            record = {'type': 'memorial', 'creator': row.pop('creator__username'), **row}
+            if include_images and row['image']:
+                try:
+                    with storage.open(row['image'], 'rb') as fh:
+                        record['image_data'] = base64.b64encode(fh.read()).decode('ascii')
+                except (OSError, ValueError) as e:
+                    self.stderr.write(f"Memorial {row['public_id']}: image {row['image']} not exported ({e})")
+            self._write(stream, record)
+
+    def _export_rows(self, stream, kind, model, fields):
+        rows = model.objects.order_by('pk').values(*fields, 'memorial__public_id')
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            self._write(stream, {'type': kind, 'memorial': row.pop('memorial__public_id'), **row})
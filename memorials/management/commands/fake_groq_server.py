@@ -0,0 +1,82 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for Groq's OpenAI-compatible chat-completions API.
+
+    Point GROQ_API_BASE at it (e.g. http://127.0.0.1:8765) with any
+    GROQ_API_KEY to exercise tribute generation without network access.
+    """
+    token_delay = 0.02
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply_text(self, payload):
+        prompt = (payload.get('messages') or [{}])[-1].get('content', '')
+        return (
+            "A gentle soul whose kindness touched everyone they met. "
+            f"(fake tribute for: {prompt[:80]})"
+        )
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self.send_error(401)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        text = self._reply_text(payload)
+
+        if not payload.get('stream'):
+            body = json.dumps({
+                'id': 'fake-completion',
+                'model': payload.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                             'finish_reason': 'stop'}],
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for word in text.split(' '):
+            chunk = {'choices': [{'index': 0, 'delta': {'content': word + ' '}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class Command(BaseCommand):
+    help = "Run a local fake Groq chat-completions server for development and tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--delay', type=float, default=FakeGroqHandler.token_delay,
+                            help="Seconds between streamed tokens")
+
+    def handle(self, *args, **options):
+        FakeGroqHandler.token_delay = options['delay']
+        server = ThreadingHTTPServer((options['host'], options['port']), FakeGroqHandler)
+        self.stdout.write(f"Fake Groq listening on http://{options['host']}:{options['port']} "
+                          f"(set GROQ_API_BASE to this URL)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
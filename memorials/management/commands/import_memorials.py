@@ -0,0 +1,152 @@
+import base64
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_datetime
+
+from memorials import anniversaries
+from memorials.counters import reconcile_queryset
+from memorials.models import Candle, Memorial, Message
+from memorials.search import get_backend
+from memorials.transfer import (
+    CANDLE_FIELDS, DATE_FIELDS, DATETIME_FIELDS, FORMAT, MEMORIAL_FIELDS, MESSAGE_FIELDS, VERSION,
+    open_stream, preserve_timestamps,
+)
+
+
+def _parse(record, fields):
+    values = {}
+    for field in fields:
+        value = record.get(field)
+        if value is not None and field in DATE_FIELDS:
+            value = parse_date(value)
+        elif value is not None and field in DATETIME_FIELDS:
+            value = parse_datetime(value)
+        values[field] = value
+    return values
+
+
+class Command(BaseCommand):
+    help = "Load an export_memorials NDJSON dump with batched bulk inserts (constant memory)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help="Dump file ('-' for stdin, '.gz' is decompressed)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Rows per bulk_create and per transaction")
+        parser.add_argument('--create-missing-users', action='store_true',
+                            help="Create creators that do not exist (with unusable passwords) instead of skipping their memorials")
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.create_users = options['create_missing_users']
+        self.storage = Memorial._meta.get_field('image').storage
+        self.users = {}
+        # Memorials that already existed: their rows were imported before, so skip their children too
+        self.existing = set()
+        self.pending = {'memorial': [], 'message': [], 'candle': []}
+        self.counts = {'memorial': 0, 'message': 0, 'candle': 0, 'skipped': 0}
+        self.started = time.monotonic()
+
+        stream = open_stream(options['input'], 'r')
+        try:
+            with preserve_timestamps():
+                for line_no, line in enumerate(stream, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        raise CommandError(f"Line {line_no}: invalid JSON ({e})")
+                    self._handle_record(line_no, record)
+                for kind in self.pending:
+                    self._flush(kind)
+        finally:
+            if options['input'] != '-':
+                stream.close()
+
+        self.stdout.write("Recomputing counters and the search index...")
+        reconcile_queryset(Memorial.objects.all(), Candle, Message)
+        get_backend().rebuild()
+        anniversaries.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.counts['memorial']:,} memorials, {self.counts['message']:,} messages, "
+            f"{self.counts['candle']:,} candles ({self.counts['skipped']:,} rows skipped) "
+            f"in {time.monotonic() - self.started:.1f}s"
+        ))
+        self.stdout.write("Run build_image_variants to create responsive variants for imported images.")
+
+    def _handle_record(self, line_no, record):
+        kind = record.get('type')
+        if kind == 'header':
+            if record.get('format') != FORMAT or record.get('version') != VERSION:
+                raise CommandError(f"Unsupported dump format {record.get('format')!r} v{record.get('version')}")
+            return
+        if kind not in self.pending:
+            raise CommandError(f"Line {line_no}: unknown record type {kind!r}")
+        if kind != 'memorial' and self.pending['memorial']:
+            # Children reference memorials by public_id, so those must be in the database first
+            self._flush('memorial')
+        self.pending[kind].append(record)
+        if len(self.pending[kind]) >= self.batch_size:
+            self._flush(kind)
+
+    def _flush(self, kind):
+        batch, self.pending[kind] = self.pending[kind], []
+        if not batch:
+            return
+        with transaction.atomic():
+            if kind == 'memorial':
+                created = self._insert_memorials(batch)
+            else:
+                created = self._insert_children(kind, batch)
+        self.counts[kind] += created
+        self.counts['skipped'] += len(batch) - created
+        total = self.counts['memorial'] + self.counts['message'] + self.counts['candle']
+        if total // 10000 != (total - created) // 10000:
+            rate = total / max(time.monotonic() - self.started, 0.001)
+            self.stdout.write(f"  {total:,} rows ({rate:,.0f}/s)")
+
+    def _creator_id(self, username):
+        if username not in self.users:
+            user = User.objects.filter(username=username).only('pk').first()
+            if user is None and self.create_users:
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save()
+            self.users[username] = user.pk if user else None
+        return self.users[username]
+
+    def _insert_memorials(self, batch):
+        public_ids = [record['public_id'] for record in batch]
+        existing = set(Memorial.objects.filter(public_id__in=public_ids).values_list('public_id', flat=True))
+        self.existing |= existing
+        memorials = []
+        for record in batch:
+            creator_id = self._creator_id(record['creator'])
+            if record['public_id'] in existing or creator_id is None:
+                self.existing.add(record['public_id'])
+                continue
+            values = _parse(record, MEMORIAL_FIELDS)
+            if record.get('image_data') and values['image']:
+                values['image'] = self.storage.save(values['image'], ContentFile(base64.b64decode(record['image_data'])))
+            memorial = Memorial(creator_id=creator_id, image_status='ready' if values['image'] else 'none', **values)
+            memorial.set_anniversary_keys()
+            memorials.append(memorial)
+        Memorial.objects.bulk_create(memorials)
+        return len(memorials)
+
+    def _insert_children(self, kind, batch):
+        model, fields = (Message, MESSAGE_FIELDS) if kind == 'message' else (Candle, CANDLE_FIELDS)
+        wanted = {record['memorial'] for record in batch} - self.existing
+        memorial_ids = dict(Memorial.objects.filter(public_id__in=wanted).values_list('public_id', 'pk'))
+        rows = [
+            model(memorial_id=memorial_ids[record['memorial']], **_parse(record, fields))
+            for record in batch if record['memorial'] in memorial_ids
+        ]
+        model.objects.bulk_create(rows)
+        return len(rows)
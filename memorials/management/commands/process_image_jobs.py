@@ -0,0 +1,54 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from memorials.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued AI memorial image generations outside the web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of waiting for new jobs")
+        parser.add_argument('--interval', type=float, default=3.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help="Exit after this many jobs (0 = no limit)")
+
+    def handle(self, *args, **options):
+        processed = 0
+        self.stdout.write("Image job worker started")
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_jobs()
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                self.stdout.write(f"Generating image for memorial {job.memorial_id} (job {job.pk})")
+                try:
+                    ok = run_job(job)
+                except Exception as e:
+                    # One bad job must not stop the worker; a job left running is retried as stale
+                    logger.exception("Image job %s crashed: %s", job.pk, e)
+                    ok = False
+                if ok:
+                    self.stdout.write(self.style.SUCCESS(f"Job {job.pk} done"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Job {job.pk} did not produce an image"))
+
+                processed += 1
+                if options['max_jobs'] and processed >= options['max_jobs']:
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Processed {processed} job(s)")
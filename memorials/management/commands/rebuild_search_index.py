@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from memorials.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the memorial full-text search index from scratch"
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} memorial(s) with the {backend.name} backend"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from memorials.counters import reconcile_queryset
+from memorials.models import Candle, Memorial, Message
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized candle/message counts and last activity of memorials"
+
+    def add_arguments(self, parser):
+        parser.add_argument('memorial_ids', nargs='*', type=int,
+                            help="Only reconcile these memorials (default: all)")
+
+    def handle(self, *args, **options):
+        memorials = Memorial.objects.all()
+        if options['memorial_ids']:
+            memorials = memorials.filter(pk__in=options['memorial_ids'])
+        updated = reconcile_queryset(memorials, Candle, Message)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {updated} memorial(s)"))
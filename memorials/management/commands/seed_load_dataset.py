@@ -0,0 +1,227 @@
+import datetime
+import random
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from communities.models import Channel, Community, CommunityMessage, Membership
+from memorials import anniversaries
+from memorials.counters import reconcile_queryset
+from memorials.models import Candle, Memorial, Message
+from memorials.search import get_backend
+from memorials.transfer import preserve_timestamps
+from tales.models import Chapter, Tale
+from users.counters import reconcile as reconcile_reactions, rebuild_conversations, rebuild_unread_totals
+from users.models import Conversation, DirectMessage, Profile, Reaction, ReactionCounter
+from users.search import changed as profiles_changed, get_backend as get_profile_search
+
+# Rows per unit of --scale
+BASE_SIZES = {
+    'users': 100,
+    'memorials': 500,
+    'candles': 10000,
+    'messages': 5000,
+    'reactions': 5000,
+    'dms': 2000,
+    'communities': 20,
+    'tales': 100,
+}
+CHANNELS_PER_COMMUNITY = 3
+MESSAGES_PER_CHANNEL = 50
+MEMBERS_PER_COMMUNITY = 20
+CHAPTERS_PER_TALE = 5
+
+FIRST_NAMES = ('Ada', 'Bruno', 'Chiara', 'Dmitri', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonah',
+               'Kavya', 'Luca', 'Maya', 'Nils', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tomas')
+LAST_NAMES = ('Abara', 'Becker', 'Costa', 'Dubois', 'Eriksen', 'Fischer', 'Garcia', 'Haddad', 'Ivanova',
+              'Jensen', 'Kowalski', 'Lindqvist', 'Moreau', 'Nakamura', 'Okafor', 'Petrov', 'Rossi', 'Silva')
+WORDS = ('light', 'garden', 'river', 'laughter', 'kindness', 'music', 'summer', 'stories', 'home',
+         'courage', 'ocean', 'letters', 'kitchen', 'mountains', 'friendship', 'dawn', 'books', 'dance')
+
+
+class Command(BaseCommand):
+    help = ("Generate a synthetic dataset (users, memorials, candles, messages, reactions, DMs, "
+            "communities, tales) with bulk inserts, for load tests and check_query_budgets")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Multiplier for the base sizes (1 = %s memorials)" % BASE_SIZES['memorials'])
+        parser.add_argument('--prefix', default='load',
+                            help="Username prefix that marks seeded rows")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable datasets")
+        parser.add_argument('--flush', action='store_true',
+                            help="Delete a previous dataset with the same prefix first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+        sizes = {name: max(1, int(n * options['scale'])) for name, n in BASE_SIZES.items()}
+        seeded = User.objects.filter(username__startswith=f'{self.prefix}_')
+        if seeded.exists():
+            if not options['flush']:
+                raise CommandError(f"Users named {self.prefix}_* already exist; pass --flush or another --prefix")
+            self.stdout.write("Deleting the previous dataset...")
+            seeded.delete()
+
+        started = time.monotonic()
+        with transaction.atomic(), preserve_timestamps():
+            users = self._users(sizes['users'])
+            memorials = self._memorials(users, sizes['memorials'])
+            self._activity(memorials, sizes['candles'], sizes['messages'])
+            tales = self._tales(users, sizes['tales'])
+            self._reactions(users, memorials, tales, sizes['reactions'])
+            self._dms(users, sizes['dms'])
+            self._communities(users, sizes['communities'])
+
+        # bulk_create sends no signals: bring the derived data up to date in one pass each
+        self.stdout.write("Reconciling counters and rebuilding the search indexes...")
+        reconcile_queryset(Memorial.objects.filter(pk__in=memorials), Candle, Message)
+        reconcile_reactions(ReactionCounter, Reaction)
+        rebuild_conversations(Conversation, DirectMessage)
+        rebuild_unread_totals(Profile, Conversation)
+        get_backend().rebuild()
+        get_profile_search().rebuild()
+        profiles_changed()
+        anniversaries.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {', '.join(f'{n:,} {name}' for name, n in sizes.items())} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def _ago(self, days):
+        return self.now - datetime.timedelta(seconds=self.rng.uniform(0, days * 86400))
+
+    def _popular(self, items):
+        # Skewed pick: a few items collect most of the activity, like real viral memorials
+        return items[int(len(items) * self.rng.random() ** 3)]
+
+    def _sentence(self, words=8):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def _person(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def _users(self, count):
+        # One hash for everyone; hashing per user would dominate the run time
+        password = make_password('load-test')
+        User.objects.bulk_create([
+            User(username=f'{self.prefix}_{i}', password=password,
+                 first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES))
+            for i in range(count)
+        ], batch_size=1000)
+        ids = list(User.objects.filter(username__startswith=f'{self.prefix}_').values_list('pk', flat=True))
+        Profile.objects.bulk_create([
+            Profile(user_id=pk, display_name=self._person(), bio=self._sentence(12),
+                    tags=', '.join(self.rng.sample(WORDS, 3)))
+            for pk in ids
+        ], batch_size=1000)
+        return ids
+
+    def _memorials(self, users, count):
+        rows = []
+        for _ in range(count):
+            born = datetime.date(self.rng.randint(1920, 1990), self.rng.randint(1, 12), self.rng.randint(1, 28))
+            passed = born + datetime.timedelta(days=self.rng.randint(20 * 365, 90 * 365))
+            created = self._ago(3 * 365)
+            memorial = Memorial(
+                creator_id=self.rng.choice(users), name=self._person(),
+                date_of_birth=born, date_of_passing=min(passed, self.now.date()),
+                biography=' '.join(self._sentence(12) for _ in range(4)), tribute=self._sentence(20),
+                public_id=uuid.uuid4().hex[:22], created_at=created, updated_at=created,
+            )
+            memorial.set_anniversary_keys()
+            rows.append(memorial)
+        Memorial.objects.bulk_create(rows, batch_size=1000)
+        return list(Memorial.objects.filter(creator_id__in=users).values_list('pk', flat=True))
+
+    def _activity(self, memorials, candles, messages):
+        Candle.objects.bulk_create([
+            Candle(memorial_id=self._popular(memorials), lit_by=self._person(),
+                   message=self._sentence(6) if self.rng.random() < 0.3 else '', lit_at=self._ago(365))
+            for _ in range(candles)
+        ], batch_size=2000)
+        Message.objects.bulk_create([
+            Message(memorial_id=self._popular(memorials), author_name=self._person(),
+                    content=self._sentence(15), created_at=self._ago(365))
+            for _ in range(messages)
+        ], batch_size=2000)
+
+    def _tales(self, users, count):
+        Tale.objects.bulk_create([
+            Tale(author_id=self.rng.choice(users), title=f"{self._sentence(3)[:-1]} {i}",
+                 slug=f'{self.prefix}-tale-{i}', subtitle=self._sentence(5), description=self._sentence(25),
+                 is_public=self.rng.random() < 0.9)
+            for i in range(count)
+        ], batch_size=1000)
+        ids = list(Tale.objects.filter(slug__startswith=f'{self.prefix}-tale-').values_list('pk', flat=True))
+        Chapter.objects.bulk_create([
+            Chapter(tale_id=pk, order=order, title=f"Chapter {order}",
+                    content='\n\n'.join(self._sentence(30) for _ in range(6)))
+            for pk in ids for order in range(1, CHAPTERS_PER_TALE + 1)
+        ], batch_size=2000)
+        return ids
+
+    def _reactions(self, users, memorials, tales, count):
+        memorial_ct = ContentType.objects.get_for_model(Memorial).id
+        tale_ct = ContentType.objects.get_for_model(Tale).id
+        seen = set()
+        rows = []
+        # Bounded attempts: (user, object) pairs are unique, so small datasets saturate
+        for _ in range(count * 2):
+            if len(rows) >= count:
+                break
+            if self.rng.random() < 0.8:
+                key = (self.rng.choice(users), memorial_ct, self._popular(memorials))
+            else:
+                key = (self.rng.choice(users), tale_ct, self._popular(tales))
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append(Reaction(user_id=key[0], content_type_id=key[1], object_id=key[2],
+                                 reaction_type=self.rng.choice(('like', 'love', 'support'))))
+        Reaction.objects.bulk_create(rows, batch_size=2000)
+
+    def _dms(self, users, count):
+        rows = []
+        for _ in range(count):
+            sender, receiver = self.rng.sample(users, 2) if len(users) > 1 else (users[0], users[0])
+            rows.append(DirectMessage(sender_id=sender, receiver_id=receiver, content=self._sentence(10),
+                                      is_read=self.rng.random() < 0.7))
+        DirectMessage.objects.bulk_create(rows, batch_size=2000)
+
+    def _communities(self, users, count):
+        Community.objects.bulk_create([
+            Community(owner_id=self.rng.choice(users), name=f"{self.prefix} circle {i}",
+                      slug=slugify(f"{self.prefix} circle {i}"), description=self._sentence(15),
+                      is_public=self.rng.random() < 0.8)
+            for i in range(count)
+        ], batch_size=1000)
+        communities = list(Community.objects.filter(name__startswith=f"{self.prefix} circle ").values_list('pk', 'owner_id'))
+        memberships = []
+        channels = []
+        for pk, owner_id in communities:
+            members = {owner_id, *self.rng.sample(users, min(MEMBERS_PER_COMMUNITY, len(users)))}
+            memberships += [Membership(community_id=pk, user_id=user_id, role='owner' if user_id == owner_id else 'member')
+                            for user_id in members]
+            channels += [Channel(community_id=pk, name=name, slug=name)
+                         for name in ('general', *self.rng.sample(WORDS, CHANNELS_PER_COMMUNITY - 1))]
+        Membership.objects.bulk_create(memberships, batch_size=2000)
+        Channel.objects.bulk_create(channels, batch_size=2000)
+        members_by_community = {}
+        for community_id, user_id in Membership.objects.filter(community_id__in=[pk for pk, _owner in communities]).values_list('community_id', 'user_id'):
+            members_by_community.setdefault(community_id, []).append(user_id)
+        CommunityMessage.objects.bulk_create([
+            CommunityMessage(channel_id=channel_id, author_id=self.rng.choice(members_by_community[community_id]),
+                             content=self._sentence(12))
+            for channel_id, community_id in Channel.objects.filter(
+                community_id__in=members_by_community).values_list('pk', 'community_id')
+            for _ in range(MESSAGES_PER_CHANNEL)
+        ], batch_size=2000)
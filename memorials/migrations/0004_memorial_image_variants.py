@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memorials', '0003_image_generation_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memorial',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:47
+
+from django.db import migrations, models
+
+from memorials.counters import reconcile_queryset
+
+
+def backfill_counters(apps, schema_editor):
+    Memorial = apps.get_model("memorials", "Memorial")
+    reconcile_queryset(
+        Memorial.objects.all(),
+        apps.get_model("memorials", "Candle"),
+        apps.get_model("memorials", "Message"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memorials", "0004_memorial_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="memorial",
+            name="candle_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="memorial",
+            name="last_activity_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="memorial",
+            name="message_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memorials", "0005_memorial_activity_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="candle",
+            index=models.Index(
+                fields=["memorial", "lit_at"], name="memorials_c_memoria_bae789_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["memorial", "created_at"], name="memorials_m_memoria_c8d21d_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:02
+
+from django.db import migrations, models
+
+from memorials.models import month_day
+
+
+def backfill_anniversary_keys(apps, schema_editor):
+    Memorial = apps.get_model("memorials", "Memorial")
+    rows = Memorial.objects.exclude(date_of_birth=None, date_of_passing=None).only(
+        "pk", "date_of_birth", "date_of_passing"
+    )
+    batch = []
+    for memorial in rows.iterator(chunk_size=2000):
+        memorial.birth_month_day = month_day(memorial.date_of_birth)
+        memorial.passing_month_day = month_day(memorial.date_of_passing)
+        batch.append(memorial)
+        if len(batch) >= 2000:
+            Memorial.objects.bulk_update(batch, ["birth_month_day", "passing_month_day"])
+            batch = []
+    Memorial.objects.bulk_update(batch, ["birth_month_day", "passing_month_day"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memorials", "0007_memorial_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="memorial",
+            name="birth_month_day",
+            field=models.PositiveSmallIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="memorial",
+            name="passing_month_day",
+            field=models.PositiveSmallIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_anniversary_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memorials", "0008_memorial_anniversary_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="memorial",
+            name="fragment_version",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
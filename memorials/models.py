@@ -4,7 +4,19 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 
+
+def month_day(value):
+    """Calendar key ``month * 100 + day`` (e.g. 1225) for anniversary lookups"""
+    return value.month * 100 + value.day if value else None
+
 class Memorial(models.Model):
+    IMAGE_STATUS_CHOICES = (
+        ('none', 'None'),
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_memorials')
     name = models.CharField(max_length=255)
     date_of_birth = models.DateField(null=True, blank=True)
@@ -15,9 +27,26 @@ class Memorial(models.Model):
     # Image can be either uploaded or AI-generated
     image = models.ImageField(upload_to='memorial_images/', null=True, blank=True)
     is_ai_generated_image = models.BooleanField(default=False)
+    # Tracks background AI image generation (see ImageGenerationJob)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default='none')
+    # Manifest of sized WebP/JPEG derivatives (see memorials.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized activity counters, kept in step by memorials.signals
+    # (recompute with `manage.py reconcile_memorial_counters`)
+    candle_count = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    # Indexed month/day of the dates above, so "on this day" is an index seek (see memorials.anniversaries)
+    birth_month_day = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
+    passing_month_day = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
+
+    # Version of the cached detail page fragments, replaced on every write (see memorials.fragment_cache)
+    fragment_version = models.BigIntegerField(default=0, editable=False)
     
     public_id = models.CharField(max_length=22, unique=True, db_index=True, blank=True)  # short UUID-like id
     
@@ -29,7 +58,16 @@ class Memorial(models.Model):
         if not self.public_id:
             # use urlsafe base64-ish without dashes for shareable IDs
             self.public_id = uuid.uuid4().hex[:22]
+        self.set_anniversary_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date_of_birth', 'date_of_passing'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'birth_month_day', 'passing_month_day'}
         super().save(*args, **kwargs)
+
+    def set_anniversary_keys(self):
+        # Also called by bulk loaders, which bypass save()
+        self.birth_month_day = month_day(self.date_of_birth)
+        self.passing_month_day = month_day(self.date_of_passing)
     
     def get_absolute_url(self):
         # Resolve by public id for stable links
@@ -41,6 +79,9 @@ class Message(models.Model):
     author_email = models.EmailField(blank=True)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['memorial', 'created_at'])]
     
     def __str__(self):
         return f"Message from {self.author_name} on {self.memorial.name}'s memorial"
@@ -50,6 +91,33 @@ class Candle(models.Model):
     lit_by = models.CharField(max_length=255)
     lit_at = models.DateTimeField(default=timezone.now)
     message = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['memorial', 'lit_at'])]
     
     def __str__(self):
         return f"Candle lit by {self.lit_by} on {self.memorial.name}'s memorial"
+
+class ImageGenerationJob(models.Model):
+    """Queued AI Horde generation, processed by the process_image_jobs command"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    memorial = models.ForeignKey(Memorial, on_delete=models.CASCADE, related_name='image_jobs')
+    prompt = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Image job {self.pk} ({self.status}) for {self.memorial.name}"
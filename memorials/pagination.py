@@ -0,0 +1,48 @@
+"""Keyset ("seek") pagination over (timestamp, id), newest first.
+
+Each page is an index range scan that starts where the previous one ended,
+so page 500 costs the same as page 1 and no COUNT(*) is needed. Cursors are
+opaque url-safe tokens; clients only ever echo back ``next_cursor``.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, pk):
+    raw = json.dumps([timestamp.isoformat(), pk], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        stamp, pk = json.loads(raw)
+        timestamp = parse_datetime(stamp)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if timestamp is None or not isinstance(pk, int):
+        raise InvalidCursor("Malformed cursor")
+    return timestamp, pk
+
+
+def keyset_page(queryset, field, cursor=None, limit=20):
+    """Return ``(items, next_cursor)`` for the page after ``cursor``, ordered by ``-field, -id``"""
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': pk}))
+    # One extra row tells us whether another page exists
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
@@ -0,0 +1,143 @@
+"""Fan-out of memorial activity to open viewers.
+
+Writers publish an event once (after their transaction commits) and every
+subscriber of the memorial's channel receives it, so live pages never
+poll the database. The default broker is in-process, which is enough for
+a single ASGI worker; ``REALTIME_BROKER`` can point at another class with
+the same ``publish``/``subscribe`` interface (e.g. one backed by Redis
+pub/sub) when events must cross processes.
+"""
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One subscriber's bounded inbox; a slow reader loses its oldest events, never blocks writers"""
+
+    def __init__(self, broker, channel, loop):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _deliver(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None once ``timeout`` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Must be called from the event loop that will read the subscription"""
+        subscription = Subscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, event):
+        """Thread-safe; callable from sync request handlers as well as coroutines"""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subs) for subs in self._channels.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'REALTIME_BROKER', 'memorials.realtime.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def memorial_channel(memorial_id):
+    return f'memorial.{memorial_id}'
+
+
+def candle_payload(candle):
+    return {
+        'id': candle.pk,
+        'lit_by': candle.lit_by,
+        'message': candle.message,
+        'lit_at': candle.lit_at.isoformat(),
+        'lit_at_display': candle.lit_at.strftime('%b %d, %Y'),
+    }
+
+
+def message_payload(message):
+    return {
+        'id': message.pk,
+        'author_name': message.author_name,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+        'created_at_display': message.created_at.strftime('%b %d, %Y'),
+    }
+
+
+def broadcast_on_commit(channel, event):
+    """Publish once the surrounding transaction commits, so subscribers never see rolled-back rows"""
+    def publish():
+        try:
+            get_broker().publish(channel, event)
+        except Exception as e:
+            logger.warning("Could not publish %s to %s: %s", event.get('type'), channel, e)
+
+    transaction.on_commit(publish)
+
+
+def publish_on_commit(memorial_id, event_type, data):
+    broadcast_on_commit(memorial_channel(memorial_id), {'type': event_type, 'memorial': memorial_id, 'data': data})
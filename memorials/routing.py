@@ -0,0 +1,18 @@
+import re
+
+from . import consumers
+
+websocket_urlpatterns = [
+    (re.compile(r'^/ws/memorial/(?P<pk>\d+)/$'), consumers.memorial_updates),
+]
+
+
+async def websocket_application(scope, receive, send):
+    """Dispatch a WebSocket connection to the first matching consumer"""
+    for pattern, consumer in websocket_urlpatterns:
+        match = pattern.match(scope['path'])
+        if match:
+            return await consumer(scope, receive, send, **match.groupdict())
+    # Unknown path: refuse the handshake
+    await receive()
+    await send({'type': 'websocket.close', 'code': 4404})
@@ -0,0 +1,211 @@
+"""Full-text search over memorials for the home page.
+
+The index lives beside the ``Memorial`` table and is chosen per database:
+an FTS5 virtual table on SQLite and a ``tsvector`` column with a GIN index
+on PostgreSQL. Both rank by relevance (name > creator > tribute >
+biography) and treat every search word as a prefix. Documents are kept in
+sync by the signals in ``memorials.signals`` and can be rebuilt with the
+``rebuild_search_index`` command. Any other database, or
+``MEMORIAL_SEARCH_BACKEND = 'basic'``, falls back to ``icontains`` filters.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 8
+BATCH_SIZE = 500
+
+# Rows both index builders read their documents from
+_SOURCE_SQL = """
+    FROM memorials_memorial m
+    JOIN auth_user u ON u.id = m.creator_id
+"""
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+class BasicSearchBackend:
+    """Unindexed substring search; used when no full-text engine is available"""
+    name = 'basic'
+
+    def setup(self, schema_editor):
+        pass
+
+    def teardown(self, schema_editor):
+        pass
+
+    def index(self, memorial_ids):
+        pass
+
+    def remove(self, memorial_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter(self, queryset, query, ranked=True):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(biography__icontains=query) |
+            Q(tribute__icontains=query) |
+            Q(creator__username__icontains=query) |
+            Q(creator__first_name__icontains=query) |
+            Q(creator__last_name__icontains=query)
+        )
+
+
+class _IndexedSearchBackend(BasicSearchBackend):
+    clear_sql = delete_sql = insert_sql = None
+
+    def _batches(self, memorial_ids):
+        memorial_ids = list(memorial_ids)
+        for start in range(0, len(memorial_ids), BATCH_SIZE):
+            batch = memorial_ids[start:start + BATCH_SIZE]
+            yield batch, ', '.join(['%s'] * len(batch))
+
+    def index(self, memorial_ids):
+        with connection.cursor() as cursor:
+            for batch, placeholders in self._batches(memorial_ids):
+                cursor.execute(self.delete_sql.format(ids=placeholders), batch)
+                cursor.execute(self.insert_sql.format(where=f'WHERE m.id IN ({placeholders})'), batch)
+
+    def remove(self, memorial_ids):
+        with connection.cursor() as cursor:
+            for batch, placeholders in self._batches(memorial_ids):
+                cursor.execute(self.delete_sql.format(ids=placeholders), batch)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(self.clear_sql)
+            cursor.execute(self.insert_sql.format(where=''))
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+
+class SQLiteSearchBackend(_IndexedSearchBackend):
+    name = 'sqlite_fts5'
+    table = 'memorials_search_fts'
+    clear_sql = f'DELETE FROM {table}'
+    delete_sql = f'DELETE FROM {table} WHERE rowid IN ({{ids}})'
+    insert_sql = f"""
+        INSERT INTO {table} (rowid, name, creator, tribute, biography)
+        SELECT m.id, m.name, u.username || ' ' || u.first_name || ' ' || u.last_name,
+               m.tribute, m.biography
+        {_SOURCE_SQL} {{where}}
+    """
+    # bm25 column weights, in column order; lower scores are better matches
+    weights = '10.0, 4.0, 2.0, 1.0'
+
+    def setup(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            "USING fts5(name, creator, tribute, biography, tokenize='porter unicode61')"
+        )
+
+    def teardown(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def filter(self, queryset, query, ranked=True):
+        terms = _terms(query)
+        if not terms:
+            return queryset.none()
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        if not ranked:
+            return queryset.filter(pk__in=matches)
+        rank = RawSQL(
+            f'SELECT bm25({self.table}, {self.weights}) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = memorials_memorial.id',
+            [match],
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('search_rank', '-created_at')
+
+
+class PostgresSearchBackend(_IndexedSearchBackend):
+    name = 'postgres'
+    table = 'memorials_search_document'
+    clear_sql = f'TRUNCATE {table}'
+    delete_sql = f'DELETE FROM {table} WHERE memorial_id IN ({{ids}})'
+    insert_sql = f"""
+        INSERT INTO {table} (memorial_id, document)
+        SELECT m.id,
+               setweight(to_tsvector('english', coalesce(m.name, '')), 'A') ||
+               setweight(to_tsvector('english', concat_ws(' ', u.username, u.first_name, u.last_name)), 'B') ||
+               setweight(to_tsvector('english', coalesce(m.tribute, '')), 'C') ||
+               setweight(to_tsvector('english', coalesce(m.biography, '')), 'D')
+        {_SOURCE_SQL} {{where}}
+    """
+
+    def setup(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            " memorial_id integer PRIMARY KEY REFERENCES memorials_memorial (id) ON DELETE CASCADE,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {self.table}_gin ON {self.table} USING gin (document)'
+        )
+
+    def teardown(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def filter(self, queryset, query, ranked=True):
+        terms = _terms(query)
+        if not terms:
+            return queryset.none()
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"SELECT memorial_id FROM {self.table} WHERE document @@ to_tsquery('english', %s)",
+            [tsquery],
+        )
+        if not ranked:
+            return queryset.filter(pk__in=matches)
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('english', %s)) FROM {self.table} "
+            f"WHERE memorial_id = memorials_memorial.id",
+            [tsquery],
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+BACKENDS = {
+    'basic': BasicSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(vendor=None):
+    """Search backend for the given (default: current) database vendor"""
+    choice = getattr(settings, 'MEMORIAL_SEARCH_BACKEND', 'auto')
+    if choice == 'auto':
+        choice = vendor or connection.vendor
+    return BACKENDS.get(choice, BasicSearchBackend)()
+
+
+def search(queryset, query, ranked=True):
+    """Filter ``queryset`` to memorials matching ``query``; ``ranked`` orders by relevance"""
+    return get_backend().filter(queryset, query, ranked=ranked)
+
+
+def index_memorials(memorial_ids):
+    try:
+        get_backend().index(memorial_ids)
+    except Exception as e:
+        # A stale search document is recoverable with rebuild_search_index; a failed save is not
+        logger.warning("Could not update search index for memorials %s: %s", list(memorial_ids), e)
+
+
+def remove_memorials(memorial_ids):
+    try:
+        get_backend().remove(memorial_ids)
+    except Exception as e:
+        logger.warning("Could not remove memorials %s from search index: %s", list(memorial_ids), e)
@@ -1,53 +1,127 @@
-import requests
 import json
-import time
 import logging
 from django.conf import settings
 
+from . import tribute_cache
+from .http_client import Deadline, get_client
+
 logger = logging.getLogger(__name__)
 
+# One pooled, circuit-broken client per upstream (per process)
+groq_client = get_client('groq', max_retries=2)
+horde_client = get_client('aihorde', max_retries=3)
+
+# Overall time budgets per logical operation, including retries and polling
+TRIBUTE_DEADLINE = 30
+IMAGE_DEADLINE = 200
+
 class GroqService:
     """Service for generating tribute text using Groq Cloud"""
-    
+
+    FALLBACK_TRIBUTE = "We encountered an issue while generating your tribute. Please try again later."
+
     @staticmethod
-    def generate_tribute(name, relationship, memories):
-        """Generate a concise, faithful tribute"""
-        try:
-            if not getattr(settings, 'GROQ_API_KEY', None):
-                raise ValueError("GROQ_API_KEY is not configured")
+    def _api_base():
+        # Overridable so a local fake server (manage.py fake_groq_server) can stand in
+        return getattr(settings, 'GROQ_API_BASE', '') or "https://api.groq.com/openai/v1"
 
-            headers = {
-                "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                "Content-Type": "application/json",
-            }
+    @staticmethod
+    def _headers():
+        if not getattr(settings, 'GROQ_API_KEY', None):
+            raise ValueError("GROQ_API_KEY is not configured")
+        return {
+            "Authorization": f"Bearer {settings.GROQ_API_KEY}",
+            "Content-Type": "application/json",
+        }
 
-            prompt = (
-                f"Write a concise tribute for {name}, my {relationship}. "
-                f"Use only these memories: {memories}. "
-                "120–180 words. Accurate, sincere, respectful. "
-                "Do not invent details. Keep it simple and meaningful."
-            )
+    @staticmethod
+    def _tribute_payload(name, relationship, memories, stream=False):
+        name, relationship, memories = (str(v or '').strip() for v in (name, relationship, memories))
+        prompt = (
+            f"Write a concise tribute for {name}, my {relationship}. "
+            f"Use only these memories: {memories}. "
+            "120–180 words. Accurate, sincere, respectful. "
+            "Do not invent details. Keep it simple and meaningful."
+        )
+        payload = {
+            "model": "llama3-70b-8192",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.2,
+            "max_tokens": 300,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
 
-            payload = {
-                "model": "llama3-70b-8192",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.2,
-                "max_tokens": 300,
-            }
+    @staticmethod
+    def generate_tribute(name, relationship, memories):
+        """Generate a concise, faithful tribute"""
+        try:
+            headers = GroqService._headers()
+            payload = GroqService._tribute_payload(name, relationship, memories)
+            cached = tribute_cache.get(payload)
+            if cached is not None:
+                return cached
 
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
+            response = groq_client.post(
+                f"{GroqService._api_base()}/chat/completions",
                 headers=headers,
                 data=json.dumps(payload),
-                timeout=30,
+                timeout=(5, 30),
+                deadline=Deadline(TRIBUTE_DEADLINE),
             )
             response.raise_for_status()
             data = response.json()
-            return data['choices'][0]['message']['content'].strip()
+            tribute = data['choices'][0]['message']['content'].strip()
+            tribute_cache.set(payload, tribute)
+            return tribute
 
         except Exception as e:
             logger.error(f"Error generating tribute: {e}")
-            return "We encountered an issue while generating your tribute. Please try again later."
+            return GroqService.FALLBACK_TRIBUTE
+
+    @staticmethod
+    def stream_tribute(name, relationship, memories):
+        """Yield the tribute text chunk by chunk as Groq produces it.
+
+        Uses the streaming chat-completions API (server-sent events). Errors
+        propagate to the caller, which decides how to report them mid-stream.
+        """
+        headers = GroqService._headers()
+        payload = GroqService._tribute_payload(name, relationship, memories, stream=True)
+        cached = tribute_cache.get(payload)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        finished = False
+        with groq_client.post(
+            f"{GroqService._api_base()}/chat/completions",
+            headers=headers,
+            data=json.dumps(payload),
+            timeout=(5, 30),
+            deadline=Deadline(TRIBUTE_DEADLINE),
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    finished = True
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        text = ''.join(parts).strip()
+        # A stream cut short (dropped connection, proxy timeout) ends without [DONE]: never cache it
+        if finished and text:
+            tribute_cache.set(payload, text)
 
 class AIHordeService:
     """Service for generating symbolic images using AI Horde"""
@@ -106,34 +180,39 @@ class AIHordeService:
                 ]
             }
             
+            deadline = Deadline(IMAGE_DEADLINE)
+
             # Submit generation request
-            submit_response = requests.post(
+            submit_response = horde_client.post(
                 "https://aihorde.net/api/v2/generate/async",
                 headers=headers,
                 data=json.dumps(payload),
-                timeout=30
+                timeout=(5, 30),
+                deadline=deadline,
             )
             submit_response.raise_for_status()
             task_id = submit_response.json().get("id")
             if not task_id:
                 raise Exception("Failed to get task ID from AI Horde.")
             
-            # Poll for results with timeout
-            for _ in range(36):  # ~3 minutes at 5s interval
-                check_response = requests.get(
+            # Poll for results over the pooled keep-alive connection until the deadline
+            while True:
+                check_response = horde_client.get(
                     f"https://aihorde.net/api/v2/generate/check/{task_id}",
                     headers=headers,
-                    timeout=20
+                    timeout=(5, 20),
+                    deadline=deadline,
                 )
                 check_response.raise_for_status()
                 status = check_response.json()
                 
                 if status.get("done", False):
                     # Get the image results
-                    result = requests.get(
+                    result = horde_client.get(
                         f"https://aihorde.net/api/v2/generate/status/{task_id}",
                         headers=headers,
-                        timeout=30
+                        timeout=(5, 30),
+                        deadline=deadline,
                     )
                     result.raise_for_status()
                     data = result.json()
@@ -141,12 +220,11 @@ class AIHordeService:
                     if gens and "img" in gens[0]:
                         return gens[0]["img"]
                     return None
+                if status.get("faulted") or status.get("is_possible") is False:
+                    raise Exception("AI Horde cannot complete this request.")
                 
-                time.sleep(5)  # Check every 5 seconds
-            
-            return None
+                deadline.sleep(5)  # Check every 5 seconds
         
         except Exception as e:
             logger.error(f"Error generating image: {e}")
             return None
-            return None
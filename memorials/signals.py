@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import anniversaries, fragment_cache, images, realtime, search
+from .counters import record_activity
+from .models import Candle, Memorial, Message
+
+
+@receiver(post_save, sender=Memorial)
+def refresh_image_variants(sender, instance, raw=False, **kwargs):
+    # Rebuild responsive variants whenever the stored image changes
+    if raw or images.variants_current(instance):
+        return
+    if not instance.image and not instance.image_variants:
+        return
+    transaction.on_commit(lambda: images.build_variants(instance))
+
+
+@receiver(post_save, sender=Memorial)
+def index_memorial(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: search.index_memorials([instance.pk]))
+
+
+@receiver(post_delete, sender=Memorial)
+def unindex_memorial(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: search.remove_memorials([pk]))
+
+
+@receiver(post_save, sender=User)
+def refresh_creator_memorials(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Creator names are in each memorial's search document and page header; logins only touch last_login
+    if created or raw or (update_fields and not {'username', 'first_name', 'last_name'} & set(update_fields)):
+        return
+    ids = list(Memorial.objects.filter(creator=instance).values_list('pk', flat=True))
+    if ids:
+        transaction.on_commit(lambda: search.index_memorials(ids))
+        transaction.on_commit(lambda: fragment_cache.bump_many(ids))
+
+
+@receiver(post_save, sender=Memorial)
+@receiver(post_delete, sender=Memorial)
+def invalidate_memorial_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragment_cache.bump_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Memorial)
+@receiver(post_delete, sender=Memorial)
+def invalidate_anniversaries(sender, instance, raw=False, **kwargs):
+    # An edit can move a memorial onto or off today's list either way, and the delete is one cache key
+    if not raw:
+        transaction.on_commit(anniversaries.invalidate)
+
+
+@receiver(post_save, sender=Candle)
+@receiver(post_delete, sender=Candle)
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_guestbook_fragments(sender, instance, raw=False, origin=None, **kwargs):
+    # Rows cascading from a memorial delete are covered by that memorial's own bump
+    if not raw and not isinstance(origin, Memorial):
+        fragment_cache.bump_on_commit(instance.memorial_id)
+
+
+@receiver(post_save, sender=Candle)
+def count_candle_lit(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_activity(Memorial, instance.memorial_id, candles=1, at=instance.lit_at)
+
+
+@receiver(post_save, sender=Message)
+def count_message_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_activity(Memorial, instance.memorial_id, messages=1, at=instance.created_at)
+
+
+@receiver(post_save, sender=Candle)
+def broadcast_candle(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_on_commit(instance.memorial_id, 'candle', realtime.candle_payload(instance))
+
+
+@receiver(post_save, sender=Message)
+def broadcast_message(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_on_commit(instance.memorial_id, 'message', realtime.message_payload(instance))
+
+
+@receiver(post_delete, sender=Candle)
+def count_candle_removed(sender, instance, origin=None, **kwargs):
+    # Skip rows cascading from a memorial delete; their counters are going away too
+    if not isinstance(origin, Memorial):
+        record_activity(Memorial, instance.memorial_id, candles=-1)
+
+
+@receiver(post_delete, sender=Message)
+def count_message_removed(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Memorial):
+        record_activity(Memorial, instance.memorial_id, messages=-1)
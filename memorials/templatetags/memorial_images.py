@@ -0,0 +1,36 @@
+from django import template
+from django.utils.html import format_html
+
+from memorials.images import srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def memorial_picture(memorial, sizes='100vw', css_class='', alt='', loading='lazy'):
+    """Render a memorial image as <picture> with WebP/JPEG srcset and sizes.
+
+    Falls back to the original file while variants are missing (e.g. before
+    the backfill command has run).
+    """
+    if not memorial.image:
+        return ''
+    alt = alt or f"Memorial for {memorial.name}"
+    manifest = memorial.image_variants or {}
+    jpeg_srcset = srcset(manifest, 'jpeg')
+    if not jpeg_srcset:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            memorial.image.url, alt, css_class, loading,
+        )
+    widths = sorted(int(w) for w in manifest['jpeg'])
+    # Default src: the middle size is a reasonable pick for browsers without srcset
+    fallback = memorial.image.storage.url(manifest['jpeg'][str(widths[len(widths) // 2])])
+    return format_html(
+        '<picture class="contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(manifest, 'webp'), sizes,
+        fallback, jpeg_srcset, sizes, alt, css_class, loading,
+    )
@@ -0,0 +1,19 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+# The test runner turns DEBUG off, and the manifest storage needs collectstatic first
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryBudgetTests(TestCase):
+    """Runs check_query_budgets against a small seeded dataset so ``manage.py test`` enforces the budgets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_load_dataset', '--scale', '0.05', '--prefix', 'budget', stdout=StringIO())
+
+    def test_pages_within_query_budgets(self):
+        # Query counts only: timings on a shared CI machine are too noisy to gate on.
+        # A single request per page is the cold one: unread DMs are still unread, caches are empty.
+        call_command('check_query_budgets', '--repeat', '1', '--latency-factor', '0', stdout=StringIO())
@@ -0,0 +1,67 @@
+"""NDJSON interchange format for moving memorials between databases.
+
+One JSON object per line: a ``header`` record, then every ``memorial``,
+then their ``message`` and ``candle`` rows. Rows reference memorials by
+``public_id`` and creators by username, so a dump restores into a
+database with different primary keys (e.g. SQLite to PostgreSQL).
+Files ending in ``.gz`` are compressed transparently.
+"""
+import datetime
+import gzip
+import io
+import sys
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Memorial, Message
+
+FORMAT = 'eterna-memorials'
+VERSION = 1
+
+MEMORIAL_FIELDS = (
+    'public_id', 'name', 'date_of_birth', 'date_of_passing', 'biography', 'tribute',
+    'image', 'is_ai_generated_image', 'created_at', 'updated_at',
+)
+MESSAGE_FIELDS = ('author_name', 'author_email', 'content', 'created_at')
+CANDLE_FIELDS = ('lit_by', 'message', 'lit_at')
+
+DATE_FIELDS = {'date_of_birth', 'date_of_passing'}
+DATETIME_FIELDS = {'created_at', 'updated_at', 'lit_at'}
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """Keeps microseconds, which DjangoJSONEncoder drops; keyset cursors compare exact timestamps"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def open_stream(path, mode):
+    """Text stream for ``path``; ``-`` is stdin/stdout"""
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+@contextmanager
+def preserve_timestamps():
+    """Let bulk_create keep exported created_at/updated_at instead of stamping "now\""""
+    fields = [
+        Memorial._meta.get_field('created_at'),
+        Memorial._meta.get_field('updated_at'),
+        Message._meta.get_field('created_at'),
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
@@ -0,0 +1,101 @@
+"""Content-addressed cache for AI tribute generations.
+
+Results are keyed by a hash of the normalized prompt plus the model
+parameters, so an identical request (e.g. a resubmit after a form
+validation error) never reaches the paid API twice. Lookups try the fast
+``default`` cache first and then the durable ``ai_results`` cache
+(database or file backed, shared across workers and restarts); size and
+TTL bounds come from the cache configuration in settings.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'tribute:v1:'
+DURABLE_ALIAS = 'ai_results'
+
+_stats = {'hits_fast': 0, 'hits_durable': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+_stats_lock = threading.Lock()
+
+
+def _incr(field):
+    with _stats_lock:
+        _stats[field] += 1
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', str(text or '')).strip()
+
+
+def cache_key(payload):
+    """Stable key for a chat-completions payload, ignoring transport-only flags"""
+    canonical = {
+        'model': payload.get('model'),
+        'temperature': payload.get('temperature'),
+        'max_tokens': payload.get('max_tokens'),
+        'messages': [
+            {'role': m.get('role'), 'content': _normalize(m.get('content'))}
+            for m in payload.get('messages', [])
+        ],
+    }
+    digest = hashlib.sha256(json.dumps(canonical, sort_keys=True).encode('utf-8')).hexdigest()
+    return KEY_PREFIX + digest
+
+
+def _tiers():
+    tiers = [caches['default']]
+    try:
+        tiers.append(caches[DURABLE_ALIAS])
+    except InvalidCacheBackendError:
+        pass
+    return tiers
+
+
+def get(payload):
+    key = cache_key(payload)
+    fast, *durable = _tiers()
+    try:
+        value = fast.get(key)
+        if value is not None:
+            _incr('hits_fast')
+            return value
+        for backend in durable:
+            value = backend.get(key)
+            if value is not None:
+                _incr('hits_durable')
+                fast.set(key, value)
+                return value
+    except Exception as e:
+        # A missing cache table or unreachable backend must never break generation
+        _incr('errors')
+        logger.warning("Tribute cache lookup failed: %s", e)
+    _incr('misses')
+    return None
+
+
+def set(payload, text):
+    if not text:
+        return
+    key = cache_key(payload)
+    try:
+        for backend in _tiers():
+            backend.set(key, text)
+        _incr('stores')
+    except Exception as e:
+        _incr('errors')
+        logger.warning("Tribute cache store failed: %s", e)
+
+
+def stats():
+    with _stats_lock:
+        data = dict(_stats)
+    lookups = data['hits_fast'] + data['hits_durable'] + data['misses']
+    data['hit_ratio'] = round((lookups - data['misses']) / lookups, 3) if lookups else None
+    return data
@@ -3,14 +3,23 @@ from . import views
 
 urlpatterns = [
     path('', views.HomePageView.as_view(), name='home'),
+    path('memorials/feed/', views.memorials_feed, name='memorials_feed'),
+    path('memorials/constellation.json', views.constellation_data, name='constellation_data'),
+    path('memorials/on-this-day.json', views.on_this_day, name='on_this_day'),
+    path('live/', views.live_feed, name='live_feed'),
     path('memorial/<int:pk>/', views.MemorialDetailView.as_view(), name='memorial_detail'),
     path('memorial/create/', views.create_memorial, name='create_memorial'),
+    path('memorial/tribute/stream/', views.stream_tribute, name='stream_tribute'),
     path('memorial/<int:pk>/update/', views.update_memorial, name='update_memorial'),
     path('memorial/<int:pk>/delete/', views.delete_memorial, name='delete_memorial'),
     path('memorial/<int:memorial_pk>/message/', views.add_message, name='add_message'),
     path('memorial/<int:memorial_pk>/candle/', views.light_candle, name='light_candle'),
+    path('memorial/<int:memorial_pk>/messages/', views.memorial_messages, name='memorial_messages'),
+    path('memorial/<int:memorial_pk>/candles/', views.memorial_candles, name='memorial_candles'),
+    path('memorial/<int:pk>/image-status/', views.memorial_image_status, name='memorial_image_status'),
     path('m/<str:public_id>/', views.MemorialByIdView.as_view(), name='memorial_detail_by_id'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),  # NEW
     path('privacy/', views.privacy, name='privacy'),
+    path('ops/metrics/', views.ops_metrics, name='ops_metrics'),
 ]
@@ -1,45 +1,83 @@
 import os
-import requests
+import json
+import hashlib
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView
 from django.urls import reverse
-from django.http import JsonResponse
-from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+from django.template.loader import render_to_string
+from urllib.parse import urlencode
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
+from django.utils.decorators import method_decorator
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
 from django.conf import settings
 from django import forms
 from django.core.mail import send_mail, BadHeaderError
 import logging
 
-from .models import Memorial, Message, Candle
+from .models import Memorial, Message, Candle, ImageGenerationJob
 from .forms import MemorialForm, MessageForm, CandleForm
-from .services import GroqService, AIHordeService
+from .services import GroqService
+from .jobs import enqueue_image_job
+from .http_client import client_stats
+from .pagination import InvalidCursor, keyset_page
+from .realtime import candle_payload, message_payload
+from . import anniversaries
+from . import candle_buffer
+from . import constellation
+from . import fragment_cache
+from . import livefeed
+from . import search as memorial_search
+from . import tribute_cache
+from users import reactions
+from users.context_processors import viewer_etag
 
 logger = logging.getLogger(__name__)
 
-# Helper: download and save a remote image with validation and timeout
-def _save_image_from_url(memorial, url, filename_prefix='ai_memorial'):
-    try:
-        resp = requests.get(url, timeout=20, stream=True)
-        resp.raise_for_status()
-        ctype = resp.headers.get('Content-Type', '')
-        if 'image' not in ctype:
-            return False, f"Non-image content received ({ctype or 'unknown type'})"
-        ext = 'png'
-        if 'jpeg' in ctype or 'jpg' in ctype:
-            ext = 'jpg'
-        elif 'webp' in ctype:
-            ext = 'webp'
-        image_name = f"{filename_prefix}_{memorial.name.replace(' ', '_')}.{ext}"
-        memorial.image.save(image_name, ContentFile(resp.content), save=False)
-        memorial.is_ai_generated_image = True
-        return True, None
-    except Exception as e:
-        logger.exception("Failed to download AI image from %s: %s", url, e)
-        return False, str(e)
+GUESTBOOK_PAGE_SIZE = 24
+GUESTBOOK_MAX_PAGE_SIZE = 100
+
+def _searching(request):
+    # Searches list by relevance and page by offset (a created_at cursor cannot seek through
+    # ranked results); every other listing is newest first and pages by cursor
+    return bool((request.GET.get('search') or '').strip())
+
+def _filter_memorials(request, qs):
+    """Apply the home page ``search`` and ``creator`` filters"""
+    search = (request.GET.get('search') or '').strip()
+    creator_id = (request.GET.get('creator') or '').strip()
+    if creator_id.isdigit():
+        qs = qs.filter(creator__id=int(creator_id))
+    if search:
+        # A pasted memorial ID is an exact lookup, not a text search
+        by_id = qs.filter(public_id__iexact=search)
+        qs = by_id if by_id.exists() else memorial_search.search(qs, search)
+    return qs
+
+class SearchPaginator(Paginator):
+    """Offset pager for ranked searches: lists only the best MEMORIAL_SEARCH_MAX_RESULTS matches.
+
+    The count runs on the unsliced queryset, where the database can skip the
+    ranking (slicing first would rank every match just to count them).
+    """
+
+    @cached_property
+    def count(self):
+        return min(self.object_list.count(), getattr(settings, 'MEMORIAL_SEARCH_MAX_RESULTS', 240))
+
+def _listing_url(request, after=None):
+    params = {key: request.GET[key] for key in ('search', 'creator') if request.GET.get(key)}
+    if after:
+        params['after'] = after
+    return f"{reverse('home')}?{urlencode(params)}" if params else reverse('home')
 
 class HomePageView(ListView):
     model = Memorial
@@ -48,24 +86,110 @@ class HomePageView(ListView):
     ordering = ['-created_at']
     paginate_by = 6
 
+    def offset_mode(self):
+        # ?page=N links keep working; searches always page by offset (see _searching)
+        return self.page_kwarg in self.request.GET or _searching(self.request)
+
     def get_queryset(self):
-        qs = super().get_queryset().select_related('creator')
-        search = (self.request.GET.get('search') or '').strip()
-        creator_id = (self.request.GET.get('creator') or '').strip()
-        if creator_id.isdigit():
-            qs = qs.filter(creator__id=int(creator_id))
-        if search:
-            qs = qs.filter(
-                Q(public_id__iexact=search) |
-                Q(name__icontains=search) |
-                Q(biography__icontains=search) |
-                Q(tribute__icontains=search) |
-                Q(creator__username__icontains=search) |
-                Q(creator__first_name__icontains=search) |
-                Q(creator__last_name__icontains=search)
-            )
-        return qs
+        return _filter_memorials(self.request, super().get_queryset().select_related('creator'))
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator_class = SearchPaginator if _searching(self.request) else Paginator
+        return paginator_class(queryset, per_page, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.offset_mode():
+            paginator, page, items, is_paginated = super().paginate_queryset(queryset, page_size)
+            return paginator, page, reactions.attach(items, self.request.user), is_paginated
+        # Seek past the last card instead of OFFSET + COUNT(*)
+        try:
+            items, self.next_after = keyset_page(queryset, 'created_at', self.request.GET.get('after'), page_size)
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        return None, None, reactions.attach(items, self.request.user), False
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if not self.offset_mode():
+            context['next_page_url'] = _listing_url(self.request, self.next_after) if self.next_after else ''
+            context['first_page_url'] = _listing_url(self.request) if self.request.GET.get('after') else ''
+            context['feed_url'] = reverse('memorials_feed')
+        if not any(self.request.GET.get(key) for key in ('search', 'creator', 'after', self.page_kwarg)):
+            context['anniversaries'] = anniversaries.on_this_day()
+        return context
+
+def memorials_feed(request):
+    """Home listing as JSON, for infinite scroll, in the page's order.
+
+    Listings follow the ``after`` cursor (``next_after``); searches are ranked
+    by relevance and follow ``page`` numbers (``next_page``).
+    """
+    qs = _filter_memorials(request, Memorial.objects.select_related('creator').order_by('-created_at'))
+    next_after = next_page = None
+    if _searching(request):
+        try:
+            page = SearchPaginator(qs, HomePageView.paginate_by).page(request.GET.get('page') or 1)
+        except InvalidPage:
+            return JsonResponse({'status': 'error', 'error': 'Invalid page'}, status=400)
+        items = page.object_list
+        next_page = page.next_page_number() if page.has_next() else None
+    else:
+        try:
+            items, next_after = keyset_page(qs, 'created_at', request.GET.get('after'), HomePageView.paginate_by)
+        except InvalidCursor:
+            return JsonResponse({'status': 'error', 'error': 'Invalid cursor'}, status=400)
+    items = reactions.attach(items, request.user)
+    return JsonResponse({
+        'status': 'success',
+        'results': [{
+            'id': memorial.pk,
+            'public_id': memorial.public_id,
+            'name': memorial.name,
+            'url': reverse('memorial_detail', args=[memorial.pk]),
+            'candle_count': memorial.candle_count,
+            'message_count': memorial.message_count,
+            'html': render_to_string('memorial_card.html', {'memorial': memorial}, request=request),
+        } for memorial in items],
+        'next_after': next_after,
+        'next_page': next_page,
+    })
 
+class _LazyPage:
+    """Newest keyset page of a guestbook queryset, fetched on first use"""
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+
+    @cached_property
+    def _page(self):
+        return keyset_page(self.queryset, self.field, limit=GUESTBOOK_PAGE_SIZE)
+
+    @property
+    def items(self):
+        return self._page[0]
+
+    @property
+    def next_cursor(self):
+        return self._page[1]
+
+def memorial_etag(request, pk=None, public_id=None):
+    """Validator for the detail page from a single row read, computed before any rendering"""
+    if len(messages.get_messages(request)):
+        # Queued flash messages have to be rendered, never answered with a 304
+        return None
+    lookup = {'pk': pk} if pk is not None else {'public_id': public_id}
+    row = Memorial.objects.filter(**lookup).values_list(
+        'pk', 'updated_at', 'last_activity_at', 'candle_count', 'message_count', 'image_status',
+        'image_variants', 'fragment_version', 'creator__username', 'creator__first_name', 'creator__last_name',
+    ).first()
+    if row is None:
+        return None
+    digest = hashlib.sha1(repr(row).encode('utf-8')).hexdigest()[:20]
+    # The page embeds the viewer (nav, unread badge, owner links, CSRF token), so validators are per user
+    return f"memorial-{row[0]}-{digest}-{viewer_etag(request)}"
+
+@method_decorator(condition(etag_func=memorial_etag), name='dispatch')
 class MemorialDetailView(DetailView):
     model = Memorial
     template_name = 'memorial_detail.html'
@@ -75,15 +199,16 @@ class MemorialDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         context['message_form'] = MessageForm()
         context['candle_form'] = CandleForm()
-        context['messages'] = self.object.messages.order_by('-created_at')
-        context['candles'] = self.object.candles.order_by('-lit_at')
+        # Only the newest page is rendered; older entries come from the JSON feeds.
+        # Pages are lazy so a cached fragment skips their queries entirely.
+        context['guestbook'] = _LazyPage(self.object.messages.all(), 'created_at')
+        context['candle_page'] = _LazyPage(self.object.candles.all(), 'lit_at')
+        context['cache_version'] = fragment_cache.version(self.object)
+        context['fragment_timeout'] = getattr(settings, 'MEMORIAL_FRAGMENT_CACHE_TIMEOUT', 300)
+        context['is_owner'] = self.request.user.is_authenticated and self.request.user.pk == self.object.creator_id
         return context
 
-class MemorialByIdView(DetailView):
-    model = Memorial
-    template_name = 'memorial_detail.html'
-    context_object_name = 'memorial'
-
+class MemorialByIdView(MemorialDetailView):
     def get_object(self, queryset=None):
         pid = self.kwargs['public_id']
         return Memorial.objects.select_related('creator').get(public_id=pid)
@@ -96,7 +221,8 @@ def create_memorial(request):
             memorial = form.save(commit=False)
             memorial.creator = request.user
 
-            # Ensure robust AI image generation with validation, timeouts, and logging
+            # AI images are generated by the process_image_jobs worker; only validate here
+            image_prompt = None
             if form.cleaned_data.get('use_ai_image'):
                 prompt = (form.cleaned_data.get('image_prompt') or '').strip()
                 if not prompt:
@@ -104,28 +230,12 @@ def create_memorial(request):
                 elif not getattr(settings, 'AI_HORDE_API_KEY', ''):
                     messages.error(request, "AI image service is not configured. Please try uploading an image instead.")
                 else:
-                    try:
-                        image_payload = AIHordeService.generate_memorial_image(prompt)
-                    except Exception as e:
-                        logger.exception("AI image generation failed: %s", e)
-                        image_payload = None
-                        messages.error(request, "AI image generation failed. Please try again later.")
-                    if image_payload:
-                        if isinstance(image_payload, (bytes, bytearray)):
-                            image_name = f"ai_memorial_{memorial.name.replace(' ', '_')}.png"
-                            memorial.image.save(image_name, ContentFile(image_payload), save=False)
-                            memorial.is_ai_generated_image = True
-                        elif isinstance(image_payload, str) and image_payload.startswith('http'):
-                            ok, err = _save_image_from_url(memorial, image_payload)
-                            if not ok:
-                                messages.error(request, f"Could not download generated image. {err}")
-                        else:
-                            messages.error(request, "AI service response was not a valid image.")
-                    else:
-                        messages.error(request, "AI image service did not return an image.")
-
-            # Handle AI tribute generation if requested
-            if form.cleaned_data['generate_tribute'] and form.cleaned_data['memories']:
+                    image_prompt = prompt
+
+            # Handle AI tribute generation if requested (skipped when the form
+            # already received a streamed tribute from stream_tribute)
+            if (form.cleaned_data['generate_tribute'] and form.cleaned_data['memories']
+                    and not (form.cleaned_data.get('tribute') or '').strip()):
                 tribute = GroqService.generate_tribute(
                     form.cleaned_data['name'],
                     form.cleaned_data['relationship'],
@@ -134,12 +244,128 @@ def create_memorial(request):
                 memorial.tribute = tribute
             
             memorial.save()
+            if image_prompt:
+                enqueue_image_job(memorial, image_prompt)
             return redirect('memorial_detail', pk=memorial.pk)
     else:
         form = MemorialForm()
     
     return render(request, 'create_memorial.html', {'form': form})
 
+def memorial_image_status(request, pk):
+    """Lightweight poll target while an AI image is being generated"""
+    row = Memorial.objects.filter(pk=pk).values('image_status', 'image').first()
+    if row is None:
+        return JsonResponse({'status': 'error', 'error': 'Not found'}, status=404)
+    data = {'image_status': row['image_status'], 'image_url': ''}
+    if row['image_status'] == 'ready' and row['image']:
+        data['image_url'] = Memorial._meta.get_field('image').storage.url(row['image'])
+    elif row['image_status'] == 'failed':
+        job = (ImageGenerationJob.objects.filter(memorial_id=pk)
+               .order_by('-created_at').values('error').first())
+        data['error'] = "We couldn't create the image. Please try uploading a photo instead."
+        if job and settings.DEBUG:
+            data['detail'] = job['error']
+    resp = JsonResponse(data)
+    resp['Cache-Control'] = 'no-store'
+    return resp
+
+def _constellation_etag(request):
+    return constellation.get_dataset()[0]
+
+@condition(etag_func=_constellation_etag)
+def constellation_data(request):
+    """Precomputed star map for the home constellation view (see build_constellation)"""
+    version, body = constellation.get_dataset()
+    resp = HttpResponse(body, content_type='application/json')
+    resp['Cache-Control'] = 'public, max-age=300'
+    return resp
+
+def on_this_day(request):
+    """Memorials with a birth or passing anniversary today"""
+    day = anniversaries.today()
+    resp = JsonResponse({'status': 'success', 'date': day.isoformat(), 'results': anniversaries.on_this_day(day)})
+    resp['Cache-Control'] = 'public, max-age=300'
+    return resp
+
+def live_feed(request):
+    """New events for several DM/channel/guestbook streams in one poll (see memorials.livefeed)"""
+    try:
+        streams = livefeed.parse_streams(request.GET.getlist('s'))
+    except livefeed.InvalidStream as e:
+        return JsonResponse({'status': 'error', 'error': str(e)}, status=400)
+    try:
+        quiet = max(int(request.GET.get('quiet', 0)), 0)
+    except ValueError:
+        quiet = 0
+    resp = JsonResponse(livefeed.collect(request.user, streams, quiet, hidden=request.GET.get('hidden') == '1'))
+    resp['Cache-Control'] = 'no-store'
+    return resp
+
+def _guestbook_page(request, queryset, field, serialize):
+    try:
+        limit = min(max(int(request.GET.get('limit', GUESTBOOK_PAGE_SIZE)), 1), GUESTBOOK_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = GUESTBOOK_PAGE_SIZE
+    try:
+        items, next_cursor = keyset_page(queryset, field, request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'results': [serialize(item) for item in items],
+        'next_cursor': next_cursor,
+    })
+
+def memorial_messages(request, memorial_pk):
+    """Guestbook messages, newest first, one keyset page at a time"""
+    memorial = get_object_or_404(Memorial.objects.only('pk'), pk=memorial_pk)
+    return _guestbook_page(request, memorial.messages.all(), 'created_at', message_payload)
+
+def memorial_candles(request, memorial_pk):
+    """Lit candles, newest first, one keyset page at a time"""
+    memorial = get_object_or_404(Memorial.objects.only('pk'), pk=memorial_pk)
+    return _guestbook_page(request, memorial.candles.all(), 'lit_at', candle_payload)
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _tribute_events(name, relationship, memories):
+    try:
+        for text in GroqService.stream_tribute(name, relationship, memories):
+            yield _sse('token', {'text': text})
+        yield _sse('done', {})
+    except Exception as e:
+        logger.error("Error streaming tribute: %s", e)
+        yield _sse('error', {'error': GroqService.FALLBACK_TRIBUTE})
+
+async def _iterate_in_thread(iterator):
+    # Under ASGI a sync iterator would be buffered whole; pull each chunk off-loop instead
+    sentinel = object()
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=False)(iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+@login_required
+@require_POST
+def stream_tribute(request):
+    """Stream an AI tribute to the create/update form as server-sent events"""
+    name = (request.POST.get('name') or '').strip()
+    relationship = (request.POST.get('relationship') or '').strip()
+    memories = (request.POST.get('memories') or '').strip()
+    if not name or not memories:
+        return JsonResponse({'status': 'error', 'error': 'Name and memories are required'}, status=400)
+
+    events = _tribute_events(name, relationship, memories)
+    if isinstance(request, ASGIRequest):
+        events = _iterate_in_thread(events)
+    resp = StreamingHttpResponse(events, content_type='text/event-stream')
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
 @login_required
 def update_memorial(request, pk):
     memorial = get_object_or_404(Memorial, pk=pk, creator=request.user)
@@ -169,11 +395,14 @@ def add_message(request, memorial_pk):
         if form.is_valid():
             message = form.save(commit=False)
             message.memorial = memorial
-            message.save()
+            # Row and counter bump commit together
+            with transaction.atomic():
+                message.save()
             
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({
                     'status': 'success',
+                    'id': message.pk,
                     'author_name': message.author_name,
                     'content': message.content,
                     'created_at': message.created_at.strftime('%b %d, %Y, %I:%M %p')
@@ -183,18 +412,26 @@ def add_message(request, memorial_pk):
     return redirect('memorial_detail', pk=memorial.pk)
 
 def light_candle(request, memorial_pk):
-    memorial = get_object_or_404(Memorial, pk=memorial_pk)
+    memorial = get_object_or_404(Memorial.objects.only('pk'), pk=memorial_pk)
     
     if request.method == 'POST':
         form = CandleForm(request.POST)
         if form.is_valid():
             candle = form.save(commit=False)
             candle.memorial = memorial
-            candle.save()
+            ref = None
+            if candle_buffer.enabled():
+                # Written by the buffer's flusher within CANDLE_BUFFER_FLUSH_MS
+                ref = candle_buffer.get_buffer().submit(candle)
+            else:
+                with transaction.atomic():
+                    candle.save()
             
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({
                     'status': 'success',
+                    'id': candle.pk,
+                    'ref': ref,
                     'lit_by': candle.lit_by,
                     'message': candle.message,
                     'lit_at': candle.lit_at.strftime('%b %d, %Y, %I:%M %p')
@@ -208,6 +445,17 @@ class SimpleContactForm(forms.Form):
     email = forms.EmailField()
     message = forms.CharField(widget=forms.Textarea, max_length=2000)
 
+@staff_member_required
+def ops_metrics(request):
+    """Per-process counters for the outbound AI integrations"""
+    resp = JsonResponse({
+        'pid': os.getpid(),
+        'http_clients': client_stats(),
+        'tribute_cache': tribute_cache.stats(),
+    })
+    resp['Cache-Control'] = 'no-store'
+    return resp
+
 def about(request):
     return render(request, 'about.html')
 
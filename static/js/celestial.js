@@ -126,80 +126,85 @@ function toggleView() {
     }
 }
 
-// Transform memorial cards into interactive constellation
+// Render the precomputed constellation dataset (one star per memorial)
 function initConstellationView(container) {
-    // Clear previous stars if any
-    container.innerHTML = '';
-    
-    // Get all memorial data
-    const memorials = document.querySelectorAll('.memorial-data');
-    
-    // Position memorials randomly in the container
-    memorials.forEach(memorial => {
-        const id = memorial.getAttribute('data-id');
-        const name = memorial.getAttribute('data-name');
-        const url = memorial.getAttribute('data-url');
-        const year = memorial.getAttribute('data-year') || '';
-        
-        // Create star element
-        const star = document.createElement('a');
-        star.href = url;
-        star.classList.add('memorial-star');
-        
-        // Random position (avoid edges)
-        const x = 10 + Math.random() * 80; // 10% to 90% width
-        const y = 10 + Math.random() * 80; // 10% to 90% height
-        
-        star.style.cssText = `
-            position: absolute;
-            left: ${x}%;
-            top: ${y}%;
-            width: 12px;
-            height: 12px;
-            background: rgba(212, 175, 55, 0.8);
-            border-radius: 50%;
-            box-shadow: 0 0 10px rgba(212, 175, 55, 0.6);
-            transform: scale(1);
-            transition: all 0.3s ease;
-        `;
-        
-        // Create tooltip
-        const tooltip = document.createElement('div');
-        tooltip.classList.add('tooltip');
-        tooltip.style.cssText = `
-            position: absolute;
-            background: rgba(18, 23, 56, 0.9);
-            padding: 8px 15px;
-            border-radius: 8px;
-            color: #fffff0;
-            width: 150px;
-            left: 50%;
-            transform: translateX(-50%) translateY(15px);
-            opacity: 0;
-            pointer-events: none;
-            transition: all 0.3s ease;
-            z-index: 10;
-            border: 1px solid rgba(212, 175, 55, 0.3);
-        `;
-        tooltip.innerHTML = `${name}${year ? `<br><span style="font-size: 0.8rem; color: #e6e6fa;">${year}</span>` : ''}`;
-        
-        star.appendChild(tooltip);
-        
-        // Hover effects
-        star.addEventListener('mouseenter', () => {
-            star.style.transform = 'scale(1.8)';
-            star.style.boxShadow = '0 0 20px rgba(212, 175, 55, 0.9)';
-            tooltip.style.opacity = '1';
-            tooltip.style.transform = 'translateX(-50%) translateY(10px)';
-        });
-        
-        star.addEventListener('mouseleave', () => {
-            star.style.transform = 'scale(1)';
-            star.style.boxShadow = '0 0 10px rgba(212, 175, 55, 0.6)';
-            tooltip.style.opacity = '0';
-            tooltip.style.transform = 'translateX(-50%) translateY(15px)';
+    const datasetUrl = container.getAttribute('data-dataset-url');
+    if (!datasetUrl || container.dataset.loaded === 'true') return;
+
+    fetch(datasetUrl)
+        .then(response => response.json())
+        .then(data => {
+            container.innerHTML = '';
+            container.dataset.loaded = 'true';
+            const col = {};
+            data.fields.forEach((field, i) => { col[field] = i; });
+
+            // One shared tooltip instead of one per star keeps thousands of stars cheap
+            const tooltip = document.createElement('div');
+            tooltip.classList.add('tooltip');
+            tooltip.style.cssText = `
+                position: absolute;
+                background: rgba(18, 23, 56, 0.9);
+                padding: 8px 15px;
+                border-radius: 8px;
+                color: #fffff0;
+                width: 150px;
+                transform: translateX(-50%) translateY(15px);
+                opacity: 0;
+                pointer-events: none;
+                transition: opacity 0.3s ease;
+                z-index: 10;
+                border: 1px solid rgba(212, 175, 55, 0.3);
+            `;
+            const tooltipName = document.createElement('div');
+            const tooltipYears = document.createElement('span');
+            tooltipYears.style.cssText = 'font-size: 0.8rem; color: #e6e6fa;';
+            tooltip.append(tooltipName, tooltipYears);
+
+            const fragment = document.createDocumentFragment();
+            data.stars.forEach(row => {
+                const weight = row[col.weight];
+                const size = 4 + Math.round(weight * 10);
+                const star = document.createElement('a');
+                star.href = data.url_template.replace('{id}', row[col.id]);
+                star.classList.add('memorial-star');
+                star.setAttribute('aria-label', row[col.name]);
+                star.dataset.name = row[col.name];
+                star.dataset.years = row[col.years];
+                star.style.cssText = `
+                    position: absolute;
+                    left: ${row[col.x] * 100}%;
+                    top: ${row[col.y] * 100}%;
+                    width: ${size}px;
+                    height: ${size}px;
+                    background: rgba(212, 175, 55, ${0.5 + weight / 2});
+                    border-radius: 50%;
+                    box-shadow: 0 0 ${6 + weight * 14}px rgba(212, 175, 55, 0.6);
+                    transition: transform 0.3s ease;
+                `;
+                fragment.appendChild(star);
+            });
+            container.appendChild(fragment);
+            container.appendChild(tooltip);
+
+            container.addEventListener('mouseover', e => {
+                const star = e.target.closest('.memorial-star');
+                if (!star) return;
+                star.style.transform = 'scale(1.8)';
+                tooltipName.textContent = star.dataset.name;
+                tooltipYears.textContent = star.dataset.years;
+                tooltip.style.left = star.style.left;
+                tooltip.style.top = star.style.top;
+                tooltip.style.opacity = '1';
+            });
+            container.addEventListener('mouseout', e => {
+                const star = e.target.closest('.memorial-star');
+                if (!star) return;
+                star.style.transform = 'scale(1)';
+                tooltip.style.opacity = '0';
+            });
+        })
+        .catch(() => {
+            container.innerHTML = '<div class="h-full flex items-center justify-center p-6 text-faint-lavender">The constellation could not be loaded.</div>';
         });
-        
-        container.appendChild(star);
-    });
 }
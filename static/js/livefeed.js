@@ -0,0 +1,141 @@
+// One poller for every live stream (DM threads, channels, guestbooks) across all of a user's tabs;
+// see memorials/livefeed.py. The tab holding the 'livefeed' Web Lock polls for the streams of every
+// open tab and relays each response over a BroadcastChannel; the other tabs report their streams
+// and listen. Browsers without either API poll once per tab.
+window.LiveFeed = (function () {
+    const url = document.currentScript.dataset.url;
+    const MAX_STREAMS = 20;  // per request, as memorials.livefeed.MAX_STREAMS
+    const HEARTBEAT = 10000;
+    const streams = new Map();  // this tab's streams: 'kind:key' -> {cursor, onEvents}
+    const shared = 'BroadcastChannel' in window && !!(navigator.locks && navigator.locks.request);
+    const channel = shared ? new BroadcastChannel('livefeed') : null;
+    const tabId = Math.random().toString(36).slice(2);
+    const tabs = new Map();  // leader only: other tabs' {streams: {name: cursor}, hidden, seen}
+    let leader = !shared;
+    let timer = null;
+    let inFlight = false;
+    let quiet = 0;
+    let wokenInFlight = false;
+
+    function schedule(seconds) {
+        clearTimeout(timer);
+        timer = setTimeout(poll, seconds * 1000);
+    }
+
+    // Followers tell the leader what they follow, on every change and as a heartbeat
+    function announce() {
+        if (leader) return;
+        const cursors = {};
+        streams.forEach((s, name) => { cursors[name] = s.cursor; });
+        channel.postMessage({ type: 'streams', tab: tabId, streams: cursors, hidden: document.hidden });
+    }
+
+    // Every stream any tab follows, from the oldest cursor among them; silent tabs are dropped
+    function wanted() {
+        const union = new Map();
+        const add = (name, cursor) => union.set(name, union.has(name) ? Math.min(union.get(name), cursor) : cursor);
+        streams.forEach((s, name) => add(name, s.cursor));
+        const stale = Date.now() - 3 * HEARTBEAT;
+        tabs.forEach((tab, id) => {
+            if (tab.seen < stale) tabs.delete(id);
+            else Object.entries(tab.streams).forEach(([name, cursor]) => add(name, cursor));
+        });
+        return union;
+    }
+
+    function deliver(res) {
+        Object.entries(res.streams || {}).forEach(([name, s]) => {
+            const sub = streams.get(name);
+            if (!sub) return;
+            // The poll starts from the oldest cursor of any tab; skip what this one already has
+            const events = s.events.filter(e => e.id > sub.cursor);
+            sub.cursor = Math.max(sub.cursor, s.cursor);
+            if (events.length) sub.onEvents(events);
+        });
+        // Gone or not visible to this user: stop asking
+        (res.denied || []).forEach(name => streams.delete(name));
+    }
+
+    function poll() {
+        if (!leader || inFlight) return;
+        const union = wanted();
+        if (!union.size) return;
+        inFlight = true;
+        const params = new URLSearchParams();
+        Array.from(union).slice(0, MAX_STREAMS).forEach(([name, cursor]) => params.append('s', `${name}:${cursor}`));
+        params.set('quiet', quiet);
+        if (document.hidden && Array.from(tabs.values()).every(tab => tab.hidden)) params.set('hidden', '1');
+        let next = 30;
+        fetch(`${url}?${params}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' }, cache: 'no-store' })
+            .then(r => { if (!r.ok) throw new Error(r.status); return r.json(); })
+            .then(res => {
+                deliver(res);
+                if (channel) channel.postMessage({ type: 'events', res });
+                // Followers' cursors move with the response, ahead of their next heartbeat
+                tabs.forEach(tab => {
+                    Object.entries(res.streams || {}).forEach(([name, s]) => {
+                        if (name in tab.streams) tab.streams[name] = Math.max(tab.streams[name], s.cursor);
+                    });
+                    (res.denied || []).forEach(name => { delete tab.streams[name]; });
+                });
+                quiet = res.quiet;
+                next = res.retry_after;
+            })
+            .catch(err => console.warn('Live feed error', err))
+            .finally(() => {
+                inFlight = false;
+                schedule(wokenInFlight ? 0 : next);
+                wokenInFlight = false;
+            });
+    }
+
+    // The server stretches retry_after while nothing happens; activity brings it back
+    function wake() {
+        quiet = 0;
+        if (!leader) channel.postMessage({ type: 'wake' });
+        else if (inFlight) wokenInFlight = true;
+        else schedule(0);
+    }
+
+    document.addEventListener('visibilitychange', () => {
+        announce();
+        if (!document.hidden) wake();
+    });
+
+    if (shared) {
+        channel.onmessage = ({ data }) => {
+            if (data.type === 'events') {
+                deliver(data.res);
+            } else if (data.type === 'leader') {
+                // A new leader knows nothing of the other tabs yet
+                announce();
+            } else if (leader && data.type === 'streams') {
+                tabs.set(data.tab, { streams: data.streams, hidden: data.hidden, seen: Date.now() });
+            } else if (leader && data.type === 'bye') {
+                tabs.delete(data.tab);
+            } else if (leader && data.type === 'wake') {
+                wake();
+            }
+        };
+        // Granted to one tab at a time and held until it closes; the next waiting tab takes over
+        navigator.locks.request('livefeed', () => {
+            leader = true;
+            channel.postMessage({ type: 'leader' });
+            wake();
+            return new Promise(() => {});
+        });
+        setInterval(announce, HEARTBEAT);
+        window.addEventListener('pagehide', () => channel.postMessage({ type: 'bye', tab: tabId }));
+    }
+
+    return {
+        // cursor: id of the newest event already on the page; returns an unsubscribe function
+        subscribe(name, cursor, onEvents) {
+            streams.set(name, { cursor: cursor || 0, onEvents });
+            announce();
+            wake();
+            return () => { streams.delete(name); announce(); };
+        },
+        wake,
+    };
+})();
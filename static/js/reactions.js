@@ -0,0 +1,30 @@
+// Like/love/support toggles rendered by {% reaction_bar %}
+(function () {
+    function csrfToken() {
+        const match = document.cookie.match(/(?:^|; )csrftoken=([^;]*)/);
+        if (match) return decodeURIComponent(match[1]);
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('.reaction-bar .react-btn');
+        if (!btn || btn.disabled) return;
+        // Bars can sit inside a card link; the click is for the button only
+        e.preventDefault();
+        e.stopPropagation();
+        const bar = btn.closest('.reaction-bar');
+        fetch(bar.dataset.reactUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken(), 'X-Requested-With': 'XMLHttpRequest' },
+            body: new URLSearchParams({ model: bar.dataset.type, id: bar.dataset.id, reaction: btn.dataset.reaction })
+        }).then(r => r.json()).then(data => {
+            if (data.status !== 'ok') return;
+            bar.querySelectorAll('.react-btn').forEach(b => {
+                b.classList.toggle('bg-white', data.active && b.dataset.reaction === data.type);
+                b.classList.toggle('bg-opacity-10', data.active && b.dataset.reaction === data.type);
+                b.querySelector('.rc').textContent = ' ' + (data.counts[b.dataset.reaction] || 0);
+            });
+        });
+    });
+})();
@@ -0,0 +1,84 @@
+// Streams an AI tribute into the tribute textarea as it is generated.
+// Expects a button with data-stream-url inside the memorial form.
+function initTributeStreaming(options) {
+    const form = options.form;
+    const button = options.button;
+    const status = options.status;
+    const tributeField = options.tributeField;
+    const manualEntry = options.manualEntry;
+    if (!form || !button || !tributeField) return;
+
+    let controller = null;
+
+    function setStatus(text) {
+        if (status) status.textContent = text;
+    }
+
+    function handleEvent(block) {
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) return;
+        const payload = JSON.parse(data);
+        if (event === 'token') {
+            tributeField.value += payload.text;
+            tributeField.scrollTop = tributeField.scrollHeight;
+        } else if (event === 'done') {
+            setStatus('Tribute ready. Feel free to edit it before saving.');
+        } else if (event === 'error') {
+            setStatus(payload.error || 'Could not generate a tribute right now.');
+        }
+    }
+
+    button.addEventListener('click', function() {
+        const data = new FormData(form);
+        if (!(data.get('memories') || '').trim() || !(data.get('name') || '').trim()) {
+            setStatus('Please add a name and some memories first.');
+            return;
+        }
+        const body = new FormData();
+        ['csrfmiddlewaretoken', 'name', 'relationship', 'memories'].forEach(k => body.append(k, data.get(k) || ''));
+
+        if (controller) controller.abort();
+        controller = new AbortController();
+        tributeField.value = '';
+        if (manualEntry) {
+            manualEntry.classList.remove('hidden');
+            manualEntry.style.opacity = '1';
+        }
+        button.disabled = true;
+        setStatus('Writing…');
+
+        fetch(button.getAttribute('data-stream-url'), {
+            method: 'POST',
+            body: body,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            signal: controller.signal,
+        }).then(resp => {
+            if (!resp.ok || !resp.body) throw new Error('Bad response');
+            const reader = resp.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            function pump() {
+                return reader.read().then(({ done, value }) => {
+                    if (done) return;
+                    buffer += decoder.decode(value, { stream: true });
+                    let idx;
+                    while ((idx = buffer.indexOf('\n\n')) !== -1) {
+                        handleEvent(buffer.slice(0, idx));
+                        buffer = buffer.slice(idx + 2);
+                    }
+                    return pump();
+                });
+            }
+            return pump();
+        }).catch(err => {
+            if (err.name !== 'AbortError') setStatus('Could not generate a tribute right now.');
+        }).finally(() => {
+            button.disabled = false;
+        });
+    });
+}
@@ -1,12 +1,17 @@
+import hashlib
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
-from django.db.models import Max
+from django.db.models import Count, Max, Q, Sum
+from django.views.decorators.http import condition
 from django.urls import reverse
 from .models import Tale, Chapter
 from .forms import TaleForm, ChapterForm
 from django.contrib import messages  # NEW
 from django.http import Http404  # NEW
+from users import reactions
+from users.context_processors import viewer_etag
 
 def tale_list(request):
     q = (request.GET.get('q') or '').strip()
@@ -15,8 +20,26 @@ def tale_list(request):
         qs = qs.filter(is_public=True)
     if q:
         qs = qs.filter(title__icontains=q)
-    return render(request, 'tales/tale_list.html', {'tales': qs.order_by('-created_at')})
+    tales = reactions.attach(qs.order_by('-created_at'), request.user)
+    return render(request, 'tales/tale_list.html', {'tales': tales})
+
+def _tale_etag(request, slug):
+    tale = Tale.objects.filter(slug__iexact=slug).values(
+        'pk', 'author_id', 'is_public', 'title', 'subtitle', 'description').first()
+    if not tale:
+        return None
+    is_author = request.user.is_authenticated and request.user.pk == tale['author_id']
+    if not (tale['is_public'] or is_author):
+        return None
+    chapters = Chapter.objects.filter(tale_id=tale['pk'])
+    if not is_author:
+        chapters = chapters.filter(published=True)
+    # Any added, removed, published or reordered chapter changes one of these
+    stats = chapters.aggregate(n=Count('id'), last=Max('id'), orders=Sum('order'), live=Count('id', filter=Q(published=True)))
+    digest = hashlib.sha1(repr((tale, stats)).encode('utf-8')).hexdigest()[:20]
+    return f"tale-{tale['pk']}-{digest}-{viewer_etag(request)}"
 
+@condition(etag_func=_tale_etag)
 def tale_detail(request, slug):
     # Try case-insensitive slug match first
     tale = Tale.objects.filter(slug__iexact=slug).first()
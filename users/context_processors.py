@@ -0,0 +1,27 @@
+from django.utils.functional import SimpleLazyObject
+
+from .counters import load_unread
+from .models import Profile
+
+
+def unread_dm_count(request):
+    """The viewer's unread DM total, read once per request (the badge and the page ETags share it)"""
+    if not hasattr(request, '_unread_dm_count'):
+        request._unread_dm_count = load_unread(Profile, request.user.pk)
+    return request._unread_dm_count
+
+
+def viewer_etag(request):
+    """Per-user part of page ETags: the viewer and, since base.html shows it, their unread DM total"""
+    if not request.user.is_authenticated:
+        return 'u0'
+    return f"u{request.user.pk}-{unread_dm_count(request)}"
+
+
+def unread_dms(request):
+    """``unread_dm_count`` for the navigation badge; looked up only if a template renders it"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Lazy, like request.user: pages that never render the badge never read it
+    return {'unread_dm_count': SimpleLazyObject(lambda: unread_dm_count(request))}
@@ -0,0 +1,124 @@
+"""Maintenance of the users app's materialized counts (reaction totals, conversation state, unread DMs)"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Greatest, Least
+
+REACTION_TYPES = ('like', 'love', 'support')
+
+
+def empty_counts():
+    return dict.fromkeys(REACTION_TYPES, 0)
+
+
+def record_reaction(counter_model, content_type_id, object_id, added=None, removed=None):
+    """Move one reaction between types with a single UPDATE; call inside the toggle's transaction"""
+    if added == removed:
+        return
+    counter, _created = counter_model.objects.get_or_create(content_type_id=content_type_id, object_id=object_id)
+    changes = {}
+    if added:
+        changes[f'{added}_count'] = F(f'{added}_count') + 1
+    if removed:
+        # Clamp at zero: a drifted counter must not trip the unsigned check constraint
+        changes[f'{removed}_count'] = Greatest(F(f'{removed}_count') - 1, Value(0))
+    counter_model.objects.filter(pk=counter.pk).update(**changes)
+
+
+def load_counts(counter_model, content_type_id, object_ids):
+    """``{object_id: {'like': n, 'love': n, 'support': n}}`` for ``object_ids`` in one query"""
+    counts = {object_id: empty_counts() for object_id in object_ids}
+    rows = counter_model.objects.filter(content_type_id=content_type_id, object_id__in=counts).values_list(
+        'object_id', 'like_count', 'love_count', 'support_count')
+    for object_id, *values in rows:
+        counts[object_id] = dict(zip(REACTION_TYPES, values))
+    return counts
+
+
+def reconcile(counter_model, reaction_model, batch_size=1000):
+    """Rebuild every counter row from the Reaction table"""
+    totals = defaultdict(empty_counts)
+    grouped = (reaction_model.objects.order_by()
+               .values('content_type', 'object_id', 'reaction_type').annotate(n=Count('pk')))
+    with transaction.atomic():
+        for row in grouped:
+            totals[row['content_type'], row['object_id']][row['reaction_type']] = row['n']
+        counter_model.objects.all().delete()
+        counter_model.objects.bulk_create([
+            counter_model(content_type_id=ct_id, object_id=object_id,
+                          **{f'{rtype}_count': n for rtype, n in counts.items()})
+            for (ct_id, object_id), counts in totals.items()
+        ], batch_size=batch_size)
+    return len(totals)
+
+
+def rebuild_conversations(conversation_model, message_model):
+    """Create missing conversations, attach loose messages and recompute every pointer and unread count"""
+    pairs = {}
+    grouped = (message_model.objects.order_by().values('sender', 'receiver')
+               .annotate(last=Max('pk'), unread=Count('pk', filter=Q(is_read=False))))
+    with transaction.atomic():
+        for row in grouped:
+            pair = tuple(sorted((row['sender'], row['receiver'])))
+            state = pairs.setdefault(pair, {'last': 0, 'unread_a': 0, 'unread_b': 0})
+            state['last'] = max(state['last'], row['last'])
+            state['unread_a' if row['receiver'] == pair[0] else 'unread_b'] += row['unread']
+        existing = set(conversation_model.objects.values_list('user_a', 'user_b'))
+        conversation_model.objects.bulk_create([
+            conversation_model(user_a_id=a, user_b_id=b) for a, b in pairs.keys() - existing
+        ], batch_size=1000)
+        # One set-based UPDATE links every message to its pair's conversation
+        message_model.objects.filter(conversation=None).update(conversation=Subquery(
+            conversation_model.objects.filter(
+                user_a=Least(OuterRef('sender'), OuterRef('receiver')),
+                user_b=Greatest(OuterRef('sender'), OuterRef('receiver')),
+            ).values('pk')[:1]
+        ))
+        sent_at = dict(message_model.objects.filter(pk__in=[s['last'] for s in pairs.values()])
+                       .values_list('pk', 'created_at'))
+        conversations = list(conversation_model.objects.all())
+        for conversation in conversations:
+            state = pairs.get((conversation.user_a_id, conversation.user_b_id), {'last': None, 'unread_a': 0, 'unread_b': 0})
+            conversation.last_message_id = state['last']
+            conversation.last_activity_at = sent_at.get(state['last'])
+            conversation.unread_a, conversation.unread_b = state['unread_a'], state['unread_b']
+        conversation_model.objects.bulk_update(
+            conversations, ['last_message', 'last_activity_at', 'unread_a', 'unread_b'], batch_size=1000)
+    return len(conversations)
+
+
+def adjust_unread(profile_model, user_id, delta):
+    """Move a user's unread DM total by ``delta``; call inside the transaction that changes the conversation"""
+    if not delta:
+        return
+    profile_model.objects.filter(user_id=user_id).update(
+        unread_dm_count=Greatest(F('unread_dm_count') + delta, Value(0)))
+
+
+def load_unread(profile_model, user_id):
+    """A user's unread DM total: one primary-key read of the profile column.
+
+    Not cached: the default cache is per-process LocMem unless REDIS_URL is
+    set, and a copy there would keep serving an old badge in every worker
+    but the one that handled the send or read.
+    """
+    count = profile_model.objects.filter(user_id=user_id).values_list('unread_dm_count', flat=True).first() or 0
+    return max(count, 0)
+
+
+def rebuild_unread_totals(profile_model, conversation_model, batch_size=1000):
+    """Recompute every profile's unread DM total from the conversations' counters"""
+    totals = defaultdict(int)
+    for side in ('a', 'b'):
+        rows = (conversation_model.objects.order_by().values(f'user_{side}')
+                .annotate(n=Sum(f'unread_{side}')).values_list(f'user_{side}', 'n'))
+        for user_id, n in rows:
+            totals[user_id] += n
+    with transaction.atomic():
+        profile_model.objects.exclude(unread_dm_count=0).exclude(user_id__in=totals).update(unread_dm_count=0)
+        profiles = list(profile_model.objects.filter(user_id__in=totals).only('pk', 'user_id', 'unread_dm_count'))
+        for profile in profiles:
+            profile.unread_dm_count = totals[profile.user_id]
+        profile_model.objects.bulk_update(profiles, ['unread_dm_count'], batch_size=batch_size)
+    return len(profiles)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.search import changed, get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the profile type-ahead search index from scratch"
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        indexed = backend.rebuild()
+        # Drops cached results and makes other processes rebuild their in-memory indexes
+        changed()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} profile(s) with the {backend.name} backend"))
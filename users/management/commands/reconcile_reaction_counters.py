@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from users.counters import reconcile
+from users.models import Reaction, ReactionCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized like/love/support counts from the Reaction table"
+
+    def handle(self, *args, **options):
+        rows = reconcile(ReactionCounter, Reaction)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled reaction counters for {rows} object(s)"))
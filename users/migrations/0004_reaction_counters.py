@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from users.counters import reconcile
+
+
+def backfill_counters(apps, schema_editor):
+    reconcile(apps.get_model("users", "ReactionCounter"), apps.get_model("users", "Reaction"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("users", "0003_directmessage_reaction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReactionCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("like_count", models.PositiveIntegerField(default=0)),
+                ("love_count", models.PositiveIntegerField(default=0)),
+                ("support_count", models.PositiveIntegerField(default=0)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("content_type", "object_id")},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from users.counters import rebuild_conversations
+
+
+def backfill_conversations(apps, schema_editor):
+    rebuild_conversations(apps.get_model("users", "Conversation"), apps.get_model("users", "DirectMessage"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("users", "0004_reaction_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_activity_at", models.DateTimeField(blank=True, null=True)),
+                ("unread_a", models.PositiveIntegerField(default=0)),
+                ("unread_b", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="users.directmessage",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="user_a",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="user_b",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="directmessage",
+            name="conversation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="users.conversation",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="directmessage",
+            index=models.Index(
+                fields=["conversation", "created_at"],
+                name="users_direc_convers_32d285_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["user_a", "-last_activity_at"],
+                name="users_conve_user_a__2cb33a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["user_b", "-last_activity_at"],
+                name="users_conve_user_b__6e9546_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.CheckConstraint(
+                check=models.Q(("user_a__lt", models.F("user_b"))),
+                name="conversation_ordered_pair",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="conversation",
+            unique_together={("user_a", "user_b")},
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
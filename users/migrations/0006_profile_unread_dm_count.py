@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+from users.counters import rebuild_unread_totals
+
+
+def backfill_unread_totals(apps, schema_editor):
+    rebuild_unread_totals(apps.get_model("users", "Profile"), apps.get_model("users", "Conversation"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_conversations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="unread_dm_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from users.search import get_backend
+
+
+def create_search_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection.vendor)
+    backend.setup(schema_editor)
+    backend.rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    get_backend(schema_editor.connection.vendor).teardown(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0006_profile_unread_dm_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from users.search import PostgresProfileSearch, get_backend
+
+
+def drop_username_index(apps, schema_editor):
+    # Short prefixes now match word starts across the whole document, so nothing reads this index
+    backend = get_backend(schema_editor.connection.vendor)
+    if isinstance(backend, PostgresProfileSearch):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {backend.table}_username')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_profile_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_username_index, migrations.RunPython.noop),
+    ]
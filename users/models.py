@@ -1,10 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType  # NEW
 from django.contrib.contenttypes.fields import GenericForeignKey  # NEW
 
+from . import search
+from .counters import adjust_unread, record_reaction
+from memorials.realtime import broadcast_on_commit
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     display_name = models.CharField(max_length=100, blank=True)
@@ -12,6 +17,8 @@ class Profile(models.Model):
     profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True)
     public_search = models.BooleanField(default=True)
     tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated tags")
+    # Unread DMs over all conversations, for the navigation badge (see counters.adjust_unread)
+    unread_dm_count = models.PositiveIntegerField(default=0, editable=False)
 
     def tags_list(self):
         return [t.strip() for t in (self.tags or '').split(',') if t.strip()]
@@ -25,9 +32,24 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    # A login only stamps last_login; nothing on the profile (or its search document) changes
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
     instance.profile.save()
 
+@receiver(post_save, sender=Profile)
+def index_profile(sender, instance, raw=False, **kwargs):
+    # Also runs for username/name changes, which save the profile through save_user_profile
+    if not raw:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: search.index_profiles([user_id]))
+
+@receiver(post_delete, sender=Profile)
+def unindex_profile(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: search.remove_profiles([user_id]))
+
 # NEW: one-reaction-per-object per user; supports memorials and tales
 class Reaction(models.Model):
     REACTION_CHOICES = (
@@ -48,16 +70,153 @@ class Reaction(models.Model):
     def __str__(self):
         return f"{self.user.username} {self.reaction_type} {self.content_type.model}:{self.object_id}"
 
+# Materialized Reaction totals per object, kept in step by the react view (see users.counters)
+class ReactionCounter(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    support_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id')
+
+    def as_dict(self):
+        return {'like': self.like_count, 'love': self.love_count, 'support': self.support_count}
+
+    def __str__(self):
+        return f"{self.content_type.model}:{self.object_id} {self.as_dict()}"
+
+@receiver(post_delete, sender=Reaction)
+def uncount_cascaded_reaction(sender, instance, origin=None, **kwargs):
+    # The react view counts its own toggles; this covers reactions removed with their user
+    if isinstance(origin, User):
+        record_reaction(ReactionCounter, instance.content_type_id, instance.object_id, removed=instance.reaction_type)
+
+# One row per pair of users who have exchanged DMs (user_a has the lower id), so
+# threads and the inbox never scan the whole DirectMessage table
+class Conversation(models.Model):
+    user_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey('DirectMessage', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    # Messages each participant has not read yet
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user_a', 'user_b')
+        indexes = [
+            models.Index(fields=['user_a', '-last_activity_at']),
+            models.Index(fields=['user_b', '-last_activity_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(user_a__lt=models.F('user_b')), name='conversation_ordered_pair'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_a_id} <-> {self.user_b_id}"
+
+    @staticmethod
+    def pair(user1, user2):
+        """Canonical ``(user_a_id, user_b_id)`` for two users or user ids"""
+        ids = sorted(getattr(u, 'pk', u) for u in (user1, user2))
+        return ids[0], ids[1]
+
+    @classmethod
+    def channel(cls, user1, user2):
+        """Realtime channel for the pair's new messages; exists before the conversation row does"""
+        user_a_id, user_b_id = cls.pair(user1, user2)
+        return f'dm.{user_a_id}.{user_b_id}'
+
+    @classmethod
+    def between(cls, user1, user2, create=False):
+        user_a_id, user_b_id = cls.pair(user1, user2)
+        if create:
+            return cls.objects.get_or_create(user_a_id=user_a_id, user_b_id=user_b_id)[0]
+        return cls.objects.filter(user_a_id=user_a_id, user_b_id=user_b_id).first()
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's conversations, most recent first (one query over the two participant indexes)"""
+        return (cls.objects.filter(models.Q(user_a=user) | models.Q(user_b=user))
+                .exclude(last_activity_at=None).order_by('-last_activity_at'))
+
+    def unread_field(self, user):
+        return 'unread_a' if getattr(user, 'pk', user) == self.user_a_id else 'unread_b'
+
+    def unread_for(self, user):
+        return getattr(self, self.unread_field(user))
+
+    def other_id(self, user):
+        return self.user_b_id if getattr(user, 'pk', user) == self.user_a_id else self.user_a_id
+
+    def other(self, user):
+        return self.user_b if getattr(user, 'pk', user) == self.user_a_id else self.user_a
+
+    def record_message(self, message):
+        """Point at ``message`` and count it unread for its receiver"""
+        changes = {'last_message': message, 'last_activity_at': message.created_at}
+        if not message.is_read:
+            unread = self.unread_field(message.receiver_id)
+            changes[unread] = models.F(unread) + 1
+            adjust_unread(Profile, message.receiver_id, 1)
+        Conversation.objects.filter(pk=self.pk).update(**changes)
+
+    def mark_read(self, user):
+        """Clear ``user``'s unread count; returns how many messages that was"""
+        field = self.unread_field(user)
+        unread = getattr(self, field)
+        if not unread:
+            # The counter says there is nothing to flag, so no message rows are touched
+            return 0
+        with transaction.atomic():
+            # Re-read under a row lock: the profile total must drop by what is actually cleared
+            unread = Conversation.objects.select_for_update().filter(pk=self.pk).values_list(field, flat=True).first() or 0
+            Conversation.objects.filter(pk=self.pk).update(**{field: 0})
+            DirectMessage.objects.filter(conversation=self, receiver=user, is_read=False).update(is_read=True)
+            adjust_unread(Profile, getattr(user, 'pk', user), -unread)
+        setattr(self, field, 0)
+        return unread
+
 # NEW: simple direct message between users
 class DirectMessage(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
+    conversation = models.ForeignKey(Conversation, null=True, blank=True, on_delete=models.CASCADE, related_name='messages')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['conversation', 'created_at'])]
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        # The message and its conversation's pointer/unread count commit together
+        with transaction.atomic():
+            if self.conversation_id is None:
+                self.conversation = Conversation.between(self.sender_id, self.receiver_id, create=True)
+            super().save(*args, **kwargs)
+            if created:
+                self.conversation.record_message(self)
+                broadcast_on_commit(Conversation.channel(self.sender_id, self.receiver_id), {'type': 'dm', 'id': self.pk})
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'sender': self.sender.username,
+            'content': self.content,
+            'created_at': timezone.localtime(self.created_at).isoformat(),
+        }
 
     def __str__(self):
         return f"DM {self.sender.username} -> {self.receiver.username}: {self.content[:24]}"
+
+@receiver(post_delete, sender=Conversation)
+def uncount_deleted_conversation(sender, instance, **kwargs):
+    # e.g. cascaded from a deleted user: the other participant's badge drops what was unread here
+    adjust_unread(Profile, instance.user_a_id, -instance.unread_a)
+    adjust_unread(Profile, instance.user_b_id, -instance.unread_b)
@@ -0,0 +1,83 @@
+"""Batched reaction summaries (counts plus the viewer's own reaction) for list pages.
+
+``summarize`` takes any mix of memorials and tales and answers in at most
+two queries: one ReactionCounter read for objects whose counts are not in
+the short-lived per-object cache, and one Reaction read for the viewer.
+Views call ``attach`` on the objects they render and templates show them
+with ``{% reaction_bar obj %}`` (see users.templatetags.reactions).
+"""
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Q
+
+from .counters import REACTION_TYPES, empty_counts
+from .models import Reaction, ReactionCounter
+
+CACHE_PREFIX = 'reactions:'
+
+
+def _timeout():
+    return getattr(settings, 'REACTION_SUMMARY_CACHE_TIMEOUT', 30)
+
+
+def _cache_key(content_type_id, object_id):
+    return f'{CACHE_PREFIX}{content_type_id}:{object_id}'
+
+
+def _matching(keys):
+    by_type = {}
+    for content_type_id, object_id in keys:
+        by_type.setdefault(content_type_id, set()).add(object_id)
+    return reduce(or_, (Q(content_type_id=ct_id, object_id__in=ids) for ct_id, ids in by_type.items()))
+
+
+def summarize_keys(keys, user=None):
+    """``{(content_type_id, object_id): {'counts': {...}, 'mine': type or None}}``"""
+    keys = set(keys)
+    if not keys:
+        return {}
+    cache_keys = {_cache_key(*key): key for key in keys}
+    cached = cache.get_many(cache_keys)
+    counts = {cache_keys[k]: v for k, v in cached.items()}
+    missing = keys - counts.keys()
+    if missing:
+        fresh = {key: empty_counts() for key in missing}
+        rows = ReactionCounter.objects.filter(_matching(missing)).values_list(
+            'content_type_id', 'object_id', 'like_count', 'love_count', 'support_count')
+        for content_type_id, object_id, *values in rows:
+            fresh[content_type_id, object_id] = dict(zip(REACTION_TYPES, values))
+        cache.set_many({_cache_key(*key): value for key, value in fresh.items()}, _timeout())
+        counts.update(fresh)
+    mine = {}
+    if user is not None and user.is_authenticated:
+        rows = Reaction.objects.filter(_matching(keys), user=user).values_list(
+            'content_type_id', 'object_id', 'reaction_type')
+        mine = {(content_type_id, object_id): rtype for content_type_id, object_id, rtype in rows}
+    return {key: {'counts': counts[key], 'mine': mine.get(key)} for key in keys}
+
+
+def _key(obj):
+    # get_for_model is served from ContentType's own process cache after the first lookup
+    return ContentType.objects.get_for_model(obj).id, obj.pk
+
+
+def summarize(objects, user=None):
+    """Summaries for model instances, keyed like ``summarize_keys``"""
+    return summarize_keys((_key(obj) for obj in objects), user)
+
+
+def attach(objects, user=None):
+    """Set ``obj.reaction_summary`` on every object for ``{% reaction_bar %}``; returns the objects"""
+    objects = list(objects)
+    summaries = summarize(objects, user)
+    for obj in objects:
+        obj.reaction_summary = summaries[_key(obj)]
+    return objects
+
+
+def invalidate(content_type_id, object_id):
+    cache.delete(_cache_key(content_type_id, object_id))
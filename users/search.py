@@ -0,0 +1,334 @@
+"""Type-ahead search over public profiles for the navbar (``search_profiles``).
+
+Every search word matches as a prefix of a word in the username, the
+first/last/display names or the tags, and results rank username matches
+above name matches above tag matches. PostgreSQL answers from a
+``pg_trgm`` GIN index over one document row per profile (the migration
+creates the extension, a trusted one since PostgreSQL 13). Elsewhere each
+process keeps a sorted in-memory prefix index built from a compact
+snapshot of the same documents; a stale index keeps serving while a
+background thread rebuilds it (inside a transaction it is rebuilt in place).
+
+Profile saves bump a version in the default cache, which keys both the
+cached result lists of popular prefixes and the in-memory snapshots.
+Every lookup runs under PROFILE_SEARCH_BUDGET_MS; when the budget runs
+out the best results found so far are returned, marked incomplete (as are
+answers from an index that is being rebuilt), and are not cached.
+"""
+import hashlib
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 4
+BATCH_SIZE = 500
+VERSION_KEY = 'profile_search:version'
+# Field ranks: lower is better
+USERNAME, NAMES, TAGS = 0, 1, 2
+
+_SOURCE_SQL = """
+    FROM users_profile p
+    JOIN auth_user u ON u.id = p.user_id
+    WHERE p.public_search
+"""
+
+
+def _words(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def terms(query):
+    return _words(query)[:MAX_TERMS]
+
+
+def _fresh():
+    return time.time_ns() // 1000
+
+
+def version():
+    """Current index version; restarted from the clock if the cache lost it"""
+    try:
+        value = cache.get(VERSION_KEY)
+        if value is None:
+            value = _fresh()
+            if not cache.add(VERSION_KEY, value, timeout=None):
+                value = cache.get(VERSION_KEY, value)
+        return value
+    except Exception as e:
+        logger.warning("Profile search version lookup failed: %s", e)
+        return _fresh()
+
+
+def changed():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _fresh(), timeout=None)
+    except Exception as e:
+        logger.warning("Profile search version bump failed: %s", e)
+
+
+def _budget():
+    return getattr(settings, 'PROFILE_SEARCH_BUDGET_MS', 25) / 1000
+
+
+class _PrefixIndex:
+    """Sorted ``(word, rank, user_id)`` entries; a prefix is one bisect plus a scan of its range"""
+
+    def __init__(self, rows):
+        entries = []
+        self.usernames = {}
+        for user_id, username, first_name, last_name, display_name, tags in rows:
+            self.usernames[user_id] = username.lower()
+            fields = ((USERNAME, username), (NAMES, f'{first_name} {last_name} {display_name}'), (TAGS, tags))
+            for rank, text in fields:
+                entries += [(word, rank, user_id) for word in set(_words(text))]
+        entries.sort()
+        self.entries = entries
+        self.words = [entry[0] for entry in entries]
+
+    def search(self, terms, limit, deadline):
+        scores = None
+        complete = True
+        for term in terms:
+            found = {}
+            start = bisect_left(self.words, term)
+            end = bisect_left(self.words, term + '\U0010ffff', start)
+            for i in range(start, end):
+                if not (i - start) % 256 and time.monotonic() > deadline:
+                    complete = False
+                    break
+                _word, rank, user_id = self.entries[i]
+                if rank < found.get(user_id, TAGS + 1):
+                    found[user_id] = rank
+            if scores is None:
+                scores = found
+            else:
+                scores = {user_id: score + found[user_id] for user_id, score in scores.items() if user_id in found}
+            if not complete:
+                break
+        best = heapq.nsmallest(limit, scores, key=lambda user_id: (
+            scores[user_id], len(self.usernames[user_id]), self.usernames[user_id]))
+        return best, complete
+
+
+class MemoryProfileSearch:
+    """Process-local prefix index; works on any database"""
+    name = 'memory'
+    # Shared by every instance: one index per process
+    _index = None
+    _index_version = None
+    _built_at = 0.0
+    _lock = threading.Lock()
+    _rebuilding = False
+
+    def setup(self, schema_editor):
+        pass
+
+    def teardown(self, schema_editor):
+        pass
+
+    def index(self, user_ids):
+        # Nothing to write: the version bump in index_profiles makes every process rebuild
+        pass
+
+    def remove(self, user_ids):
+        pass
+
+    def snapshot(self, current):
+        """Compact document rows for ``current``; other workers reuse them only if the default cache is shared"""
+        key = f'profile_search:snapshot:{current}'
+        rows = cache.get(key)
+        if rows is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT u.id, u.username, u.first_name, u.last_name, p.display_name, p.tags {_SOURCE_SQL}")
+                rows = cursor.fetchall()
+            cache.set(key, rows, getattr(settings, 'PROFILE_SEARCH_INDEX_MAX_AGE', 300))
+        return rows
+
+    def rebuild(self):
+        current = version()
+        index = _PrefixIndex(self.snapshot(current))
+        cls = type(self)
+        cls._index, cls._index_version, cls._built_at = index, current, time.monotonic()
+        return len(index.usernames)
+
+    def _rebuild_in_background(self):
+        cls = type(self)
+        with cls._lock:
+            if cls._rebuilding:
+                return
+            cls._rebuilding = True
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.warning("Profile search index rebuild failed: %s", e)
+            finally:
+                cls._rebuilding = False
+                connection.close()
+
+        threading.Thread(target=run, name='profile-search-rebuild', daemon=True).start()
+
+    def current_index(self):
+        cls = type(self)
+        if cls._index is None:
+            # Cold process: nothing to serve yet, so this one request pays for the build
+            with cls._lock:
+                if cls._index is None:
+                    self.rebuild()
+        else:
+            # The version only moves within a process when the cache is local, so age bounds staleness too
+            max_age = getattr(settings, 'PROFILE_SEARCH_INDEX_MAX_AGE', 300)
+            if cls._index_version != version() or time.monotonic() - cls._built_at > max_age:
+                if connection.in_atomic_block:
+                    # A thread's own connection would queue behind this transaction's locks (on
+                    # SQLite, fail outright), so rebuild here; this includes TestCase tests
+                    with cls._lock:
+                        self.rebuild()
+                else:
+                    self._rebuild_in_background()
+        return cls._index
+
+    def search(self, terms, limit):
+        index = self.current_index()
+        user_ids, complete = index.search(terms, limit, time.monotonic() + _budget())
+        # Answers from an index that is still being rebuilt are not worth caching
+        return user_ids, complete and type(self)._index is index and self._index_version == version()
+
+
+class PostgresProfileSearch:
+    """``pg_trgm`` index over a lower-cased document per public profile"""
+    name = 'postgres'
+    table = 'users_profile_search'
+    insert_sql = f"""
+        INSERT INTO {table} (user_id, username, names, document)
+        SELECT u.id, lower(u.username),
+               lower(concat_ws(' ', u.first_name, u.last_name, p.display_name)),
+               lower(concat_ws(' ', u.username, u.first_name, u.last_name, p.display_name, p.tags))
+        {_SOURCE_SQL} {{where}}
+    """
+
+    def setup(self, schema_editor):
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            " user_id integer PRIMARY KEY REFERENCES auth_user (id) ON DELETE CASCADE,"
+            " username text NOT NULL, names text NOT NULL, document text NOT NULL)"
+        )
+        # One- and two-letter prefixes are too short for trigrams and scan instead, under the
+        # statement timeout; their complete answers are cached like any other
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {self.table}_trgm ON {self.table} USING gin (document gin_trgm_ops)')
+
+    def teardown(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def _batches(self, user_ids):
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            yield batch, ', '.join(['%s'] * len(batch))
+
+    def index(self, user_ids):
+        with connection.cursor() as cursor:
+            for batch, placeholders in self._batches(user_ids):
+                cursor.execute(f'DELETE FROM {self.table} WHERE user_id IN ({placeholders})', batch)
+                cursor.execute(self.insert_sql.format(where=f'AND u.id IN ({placeholders})'), batch)
+
+    def remove(self, user_ids):
+        with connection.cursor() as cursor:
+            for batch, placeholders in self._batches(user_ids):
+                cursor.execute(f'DELETE FROM {self.table} WHERE user_id IN ({placeholders})', batch)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(self.insert_sql.format(where=''))
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def search(self, terms, limit):
+        # Each term must start a word, as in the memory index. The LIKE is the same test loosened
+        # to a substring, which the trigram index can answer; the regex then checks word starts.
+        # Terms are \w+ words: only "_" needs escaping for LIKE and nothing does for the regex.
+        patterns = [term.replace('_', r'\_') for term in terms]
+        where, params = [], []
+        for term, pattern in zip(terms, patterns):
+            where += ['document LIKE %s', 'document ~ %s']
+            params += [f'%{pattern}%', r'\m' + term]
+        query = ' '.join(terms)
+        sql = (
+            f"SELECT user_id FROM {self.table} WHERE {' AND '.join(where)} "
+            f"ORDER BY CASE WHEN username LIKE %s THEN 0 WHEN names ~ %s THEN 1 ELSE 2 END, "
+            f"word_similarity(%s, document) DESC, length(username), username LIMIT %s"
+        )
+        params += [patterns[0] + '%', r'\m' + terms[0], query, limit]
+        timeout_ms = max(1, int(_budget() * 1000))
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [f'{timeout_ms}ms'])
+                cursor.execute(sql, params)
+                return [row[0] for row in cursor.fetchall()], True
+        except DatabaseError as e:
+            # Over budget (statement timeout): an empty, incomplete answer beats a stalled keystroke
+            logger.info("Profile search for %r gave up: %s", query, e)
+            return [], False
+
+
+BACKENDS = {
+    'memory': MemoryProfileSearch,
+    'postgresql': PostgresProfileSearch,
+}
+
+
+def get_backend(vendor=None):
+    """Search backend for the given (default: current) database vendor"""
+    choice = getattr(settings, 'PROFILE_SEARCH_BACKEND', 'auto')
+    if choice == 'auto':
+        choice = vendor or connection.vendor
+    return BACKENDS.get(choice, MemoryProfileSearch)()
+
+
+def search(query, limit=10):
+    """``(user_ids, complete)``: best public profiles for ``query``; complete results are cached"""
+    words = terms(query)
+    if not words:
+        return [], True
+    digest = hashlib.md5(' '.join(words).encode()).hexdigest()
+    key = f'profile_search:{version()}:{limit}:{digest}'
+    user_ids = cache.get(key)
+    if user_ids is not None:
+        return user_ids, True
+    user_ids, complete = get_backend().search(words, limit)
+    if complete:
+        cache.set(key, user_ids, getattr(settings, 'PROFILE_SEARCH_CACHE_TIMEOUT', 60))
+    return user_ids, complete
+
+
+def index_profiles(user_ids):
+    try:
+        get_backend().index(user_ids)
+    except Exception as e:
+        # A stale search document is recoverable with rebuild_profile_search; a failed save is not
+        logger.warning("Could not update profile search for users %s: %s", list(user_ids), e)
+    changed()
+
+
+def remove_profiles(user_ids):
+    try:
+        get_backend().remove(user_ids)
+    except Exception as e:
+        logger.warning("Could not remove users %s from profile search: %s", list(user_ids), e)
+    changed()
@@ -0,0 +1,27 @@
+from django import template
+
+from users import reactions
+
+register = template.Library()
+
+BUTTONS = (('like', '👍'), ('love', '❤️'), ('support', '🕊'))
+
+
+@register.inclusion_tag('users/reaction_bar.html', takes_context=True)
+def reaction_bar(context, obj):
+    """Like/love/support buttons for a memorial or tale.
+
+    Uses ``obj.reaction_summary`` from ``users.reactions.attach``; objects
+    rendered without it are summarized one by one (two queries each).
+    """
+    user = context.get('user')
+    summary = getattr(obj, 'reaction_summary', None)
+    if summary is None:
+        summary = reactions.attach([obj], user)[0].reaction_summary
+    return {
+        'model': obj._meta.model_name,
+        'object_id': obj.pk,
+        'mine': summary['mine'],
+        'buttons': [(rtype, label, summary['counts'][rtype]) for rtype, label in BUTTONS],
+        'can_react': bool(user and user.is_authenticated),
+    }
@@ -5,9 +5,13 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('search/', views.search_profiles, name='search_profiles'),
     path('react/', views.react, name='react'),  # NEW
+    path('reactions/', views.reaction_summaries, name='reaction_summaries'),
     path('u/<str:username>/', views.profile_detail, name='profile'),  # NEW
     path('u/<str:username>/dm/', views.send_dm, name='send_dm'),  # NEW
     # NEW: personal chat interface + feed
+    path('inbox/', views.inbox, name='inbox'),
+    path('inbox/unread.json', views.unread_count, name='unread_count'),
     path('dm/<str:username>/', views.dm_thread, name='dm_thread'),
     path('dm/<str:username>/feed/', views.dm_feed, name='dm_feed'),
+    path('dm/<str:username>/wait/', views.dm_wait, name='dm_wait'),
 ]
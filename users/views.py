@@ -1,18 +1,29 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import login
 from .forms import UserRegistrationForm
-from django.http import JsonResponse, HttpResponseForbidden  # CHANGED
-from django.db.models import Q, Count  # CHANGED
+from django.http import Http404, JsonResponse, HttpResponseForbidden  # CHANGED
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition
 from django.contrib.auth.models import User  # NEW
 from django.urls import reverse  # NEW
 from django.contrib.contenttypes.models import ContentType  # NEW
 from django.utils import timezone  # NEW
 from django.utils.dateparse import parse_datetime  # NEW
+from django.db import transaction
+from django.db.models import Q
 
 from .models import Profile  # NEW
-from .models import Reaction, DirectMessage  # NEW
+from .models import Conversation, Reaction, ReactionCounter, DirectMessage  # NEW
+from .counters import load_counts, load_unread, record_reaction
+from . import reactions
+from . import search as profile_search
 from memorials.models import Memorial  # NEW
+from memorials.pagination import InvalidCursor, keyset_page
+from memorials.realtime import get_broker
 from tales.models import Tale  # NEW
 
 def register(request):
@@ -30,20 +41,20 @@ def register(request):
 
 def search_profiles(request):
     q = request.GET.get('q', '').strip()
-    limit = int(request.GET.get('limit', 10))
-    # from .models import Profile  # now imported at top
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 20))
+    except ValueError:
+        limit = 10
 
-    qs = Profile.objects.select_related('user').filter(public_search=True)
+    complete = True
     if q:
-        qs = qs.filter(
-            Q(user__username__icontains=q) |
-            Q(user__first_name__icontains=q) |
-            Q(user__last_name__icontains=q) |
-            Q(display_name__icontains=q) |
-            Q(bio__icontains=q) |
-            Q(tags__icontains=q)
-        )
-    qs = qs.order_by('user__username')[:max(1, min(limit, 20))]
+        # Ranked ids from the type-ahead index (users.search), then one query for the rows
+        user_ids, complete = profile_search.search(q, limit)
+        position = {user_id: i for i, user_id in enumerate(user_ids)}
+        qs = sorted(Profile.objects.select_related('user').filter(user_id__in=user_ids, public_search=True),
+                    key=lambda p: position[p.user_id])
+    else:
+        qs = Profile.objects.select_related('user').filter(public_search=True).order_by('user__username')[:limit]
 
     def avatar_url(p):
         return p.profile_image.url if p.profile_image else ''
@@ -61,7 +72,8 @@ def search_profiles(request):
         }
         for p in qs
     ]
-    return JsonResponse({'results': data})
+    # complete=False: the time budget ran out and these are the best matches found so far
+    return JsonResponse({'results': data, 'complete': complete})
 
 # NEW: profile explore page
 def profile_detail(request, username):
@@ -73,66 +85,21 @@ def profile_detail(request, username):
     memorials = Memorial.objects.filter(creator=profile_user).select_related('creator')
     tales = Tale.objects.filter(author=profile_user)
 
-    # Reaction counts for memorials
-    ct_mem = ContentType.objects.get_for_model(Memorial)
-    mem_ids = list(memorials.values_list('id', flat=True))
-    mem_reacts = (Reaction.objects.filter(content_type=ct_mem, object_id__in=mem_ids)
-                  .values('object_id', 'reaction_type').annotate(c=Count('id')))
-    mem_counts = {mid: {'like': 0, 'love': 0, 'support': 0} for mid in mem_ids}
-    for r in mem_reacts:
-        mem_counts[r['object_id']][r['reaction_type']] = r['c']
-
-    user_mem_react = {}
-    if request.user.is_authenticated and mem_ids:
-        user_rs = Reaction.objects.filter(user=request.user, content_type=ct_mem, object_id__in=mem_ids)
-        user_mem_react = {r.object_id: r.reaction_type for r in user_rs}
-
-    # Reaction counts for tales
-    ct_tale = ContentType.objects.get_for_model(Tale)
-    tale_ids = list(tales.values_list('id', flat=True))
-    tale_reacts = (Reaction.objects.filter(content_type=ct_tale, object_id__in=tale_ids)
-                   .values('object_id', 'reaction_type').annotate(c=Count('id')))
-    tale_counts = {tid: {'like': 0, 'love': 0, 'support': 0} for tid in tale_ids}
-    for r in tale_reacts:
-        tale_counts[r['object_id']][r['reaction_type']] = r['c']
-
-    user_tale_react = {}
-    if request.user.is_authenticated and tale_ids:
-        user_rs = Reaction.objects.filter(user=request.user, content_type=ct_tale, object_id__in=tale_ids)
-        user_tale_react = {r.object_id: r.reaction_type for r in user_rs}
+    # Reaction counts and the viewer's own reaction, batched across both lists
+    memorials, tales = list(memorials), list(tales)
+    reactions.attach(memorials + tales, request.user)
 
     # Recent DMs (if logged in)
     convo = []
     if request.user.is_authenticated and request.user != profile_user:
-        convo = DirectMessage.objects.filter(
-            Q(sender=request.user, receiver=profile_user) | Q(sender=profile_user, receiver=request.user)
-        ).order_by('-created_at')[:20]
-        convo = list(convo)[::-1]  # oldest first
-
-    # Attach counts and current user reaction to each memorial
-    for m in memorials:
-        c = mem_counts.get(m.id, {'like': 0, 'love': 0, 'support': 0})
-        m.count_like = c.get('like', 0)
-        m.count_love = c.get('love', 0)
-        m.count_support = c.get('support', 0)
-        m.my_react = user_mem_react.get(m.id)
-
-    # Attach counts and current user reaction to each tale
-    for t in tales:
-        c = tale_counts.get(t.id, {'like': 0, 'love': 0, 'support': 0})
-        t.count_like = c.get('like', 0)
-        t.count_love = c.get('love', 0)
-        t.count_support = c.get('support', 0)
-        t.my_react = user_tale_react.get(t.id)
+        conversation = Conversation.between(request.user, profile_user)
+        if conversation:
+            convo = list(conversation.messages.select_related('sender').order_by('-created_at')[:20])[::-1]  # oldest first
 
     ctx = {
         'profile_user': profile_user,
         'memorials': memorials,
         'tales': tales,
-        'mem_counts': mem_counts,
-        'user_mem_react': user_mem_react,
-        'tale_counts': tale_counts,
-        'user_tale_react': user_tale_react,
         'convo': convo,
     }
     return render(request, 'users/profile_detail.html', ctx)
@@ -162,29 +129,55 @@ def react(request):
     if not model_cls.objects.filter(id=obj_id).exists():
         return JsonResponse({'status': 'error', 'error': 'Not found'}, status=404)
 
-    # Toggle logic: single reaction per object per user
-    existing = Reaction.objects.filter(user=request.user, content_type=ct, object_id=obj_id).first()
-    active = False
-    if existing and existing.reaction_type == rtype:
-        existing.delete()
-        active = False
-    else:
-        if existing:
-            existing.reaction_type = rtype
-            existing.save(update_fields=['reaction_type'])
+    # Toggle logic: single reaction per object per user; the counter row moves in the same transaction
+    with transaction.atomic():
+        existing = Reaction.objects.select_for_update().filter(user=request.user, content_type=ct, object_id=obj_id).first()
+        previous = existing.reaction_type if existing else None
+        if existing and existing.reaction_type == rtype:
+            existing.delete()
+            active = False
         else:
-            Reaction.objects.create(user=request.user, content_type=ct, object_id=obj_id, reaction_type=rtype)
-        active = True
-
-    # Recompute counts
-    counts_qs = Reaction.objects.filter(content_type=ct, object_id=obj_id) \
-        .values('reaction_type').annotate(c=Count('id'))
-    counts = {'like': 0, 'love': 0, 'support': 0}
-    for r in counts_qs:
-        counts[r['reaction_type']] = r['c']
+            if existing:
+                existing.reaction_type = rtype
+                existing.save(update_fields=['reaction_type'])
+            else:
+                Reaction.objects.create(user=request.user, content_type=ct, object_id=obj_id, reaction_type=rtype)
+            active = True
+        record_reaction(ReactionCounter, ct.id, obj_id, added=rtype if active else None, removed=previous)
+        counts = load_counts(ReactionCounter, ct.id, [obj_id])[obj_id]
+        transaction.on_commit(lambda: reactions.invalidate(ct.id, obj_id))
 
     return JsonResponse({'status': 'ok', 'counts': counts, 'active': active, 'type': rtype})
 
+def reaction_summaries(request):
+    """Bulk counts and the viewer's reaction: ?memorial=1,2&tale=3 (up to 100 ids)"""
+    keys = []
+    for name, model_cls in (('memorial', Memorial), ('tale', Tale)):
+        ct_id = ContentType.objects.get_for_model(model_cls).id
+        ids = [part for part in (request.GET.get(name) or '').split(',') if part.strip()]
+        try:
+            keys += [(ct_id, int(part)) for part in ids]
+        except ValueError:
+            return JsonResponse({'status': 'error', 'error': f'Invalid {name} id'}, status=400)
+    if len(keys) > 100:
+        return JsonResponse({'status': 'error', 'error': 'Too many ids'}, status=400)
+    names = {ContentType.objects.get_for_model(m).id: m._meta.model_name for m in (Memorial, Tale)}
+    tale_ct_id = ContentType.objects.get_for_model(Tale).id
+    tale_ids = [object_id for ct_id, object_id in keys if ct_id == tale_ct_id]
+    if tale_ids:
+        # Private tales only exist for their author, as on the tale pages
+        visible = Q(is_public=True)
+        if request.user.is_authenticated:
+            visible |= Q(author=request.user)
+        allowed = set(Tale.objects.filter(visible, pk__in=tale_ids).values_list('pk', flat=True))
+        keys = [(ct_id, object_id) for ct_id, object_id in keys if ct_id != tale_ct_id or object_id in allowed]
+    results = {'memorial': {}, 'tale': {}}
+    for (ct_id, object_id), summary in reactions.summarize_keys(keys, request.user).items():
+        results[names[ct_id]][str(object_id)] = summary
+    resp = JsonResponse({'status': 'ok', 'results': results})
+    resp['Cache-Control'] = 'private, max-age=10'
+    return resp
+
 # NEW: send direct message
 def send_dm(request, username):
     if request.method != 'POST':
@@ -202,6 +195,7 @@ def send_dm(request, username):
     if not content:
         return JsonResponse({'status': 'error', 'error': 'Empty message'}, status=400)
 
+    # Also moves the conversation's last-message pointer and the receiver's unread count (DirectMessage.save)
     dm = DirectMessage.objects.create(sender=request.user, receiver=receiver, content=content)
     return JsonResponse({
         'status': 'ok',
@@ -212,6 +206,29 @@ def send_dm(request, username):
         'created_at_iso': timezone.localtime(dm.created_at).isoformat()  # NEW
     })
 
+def unread_count(request):
+    """The signed-in user's unread DM total, without touching the messages table"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'error', 'error': 'Auth required'}, status=401)
+    resp = JsonResponse({'status': 'ok', 'unread': load_unread(Profile, request.user.pk)})
+    resp['Cache-Control'] = 'private, no-cache'
+    return resp
+
+INBOX_PAGE_SIZE = 30
+
+@login_required
+def inbox(request):
+    """The user's conversations, most recent first"""
+    conversations = Conversation.for_user(request.user).select_related('user_a', 'user_b', 'last_message')
+    try:
+        conversations, next_cursor = keyset_page(conversations, 'last_activity_at', request.GET.get('after'), INBOX_PAGE_SIZE)
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+    for conversation in conversations:
+        conversation.peer = conversation.other(request.user)
+        conversation.unread = conversation.unread_for(request.user)
+    return render(request, 'users/inbox.html', {'conversations': conversations, 'next_cursor': next_cursor})
+
 # NEW: full-screen personal chat thread
 def dm_thread(request, username):
     if not request.user.is_authenticated:
@@ -223,28 +240,39 @@ def dm_thread(request, username):
         return HttpResponseForbidden("Cannot chat with yourself")
 
     # Fetch last 50 messages between users, oldest first for display
-    qs = DirectMessage.objects.filter(
-        Q(sender=request.user, receiver=other) | Q(sender=other, receiver=request.user)
-    ).order_by('-created_at')[:50]
-    messages_qs = list(qs)[::-1]
-
-    # Mark received messages as read
-    DirectMessage.objects.filter(receiver=request.user, sender=other, is_read=False).update(is_read=True)
-
-    # NEW: latest timestamp of already-rendered messages (list is oldest->newest)
-    last_ts = None
-    if messages_qs:
-        last_ts = timezone.localtime(messages_qs[-1].created_at).isoformat()
+    conversation = Conversation.between(request.user, other)
+    messages_qs = []
+    if conversation:
+        messages_qs = list(conversation.messages.select_related('sender').order_by('-created_at')[:50])[::-1]
+        conversation.mark_read(request.user)
 
     ctx = {
         'other': other,
-        'messages': messages_qs,
-        # NEW
-        'last_ts': last_ts,
+        'dm_messages': messages_qs,
+        # Cursor for dm_wait: the newest message already on the page
+        'last_id': messages_qs[-1].id if messages_qs else 0,
     }
     return render(request, 'users/dm_thread.html', ctx)
 
+DM_BATCH_SIZE = 100
+
+def _has_unread(messages_qs, user):
+    # The read-marker write is only worth issuing when this response delivered something unread
+    return any(m.receiver_id == user.pk and not m.is_read for m in messages_qs)
+
 # NEW: JSON feed for new messages since timestamp (ISO)
+def _dm_feed_etag(request, username):
+    if not request.user.is_authenticated:
+        return None
+    other_id = User.objects.filter(username=username).values_list('pk', flat=True).first()
+    if other_id is None:
+        return None
+    # The conversation's last-message pointer moves with every send
+    user_a_id, user_b_id = Conversation.pair(request.user, other_id)
+    last = Conversation.objects.filter(user_a_id=user_a_id, user_b_id=user_b_id).values_list('last_message_id', flat=True).first()
+    return f"dm-{request.user.pk}-{other_id}-{last or 0}"
+
+@condition(etag_func=_dm_feed_etag)
 def dm_feed(request, username):
     if not request.user.is_authenticated:
         return JsonResponse({'results': []}, status=401)
@@ -252,26 +280,88 @@ def dm_feed(request, username):
     if not other:
         return JsonResponse({'results': []}, status=404)
 
+    conversation = Conversation.between(request.user, other)
+    if not conversation:
+        resp = JsonResponse({'results': []})
+        resp['Cache-Control'] = 'private, no-cache'
+        return resp
+    qs = conversation.messages.select_related('sender').order_by('pk')
+    after = request.GET.get('after')
     since = request.GET.get('since')
-    qs = DirectMessage.objects.filter(
-        Q(sender=request.user, receiver=other) | Q(sender=other, receiver=request.user)
-    ).order_by('created_at')
-    if since:
+    if after and after.isdigit():
+        qs = qs.filter(pk__gt=int(after))
+    elif since:
+        # Older clients; timestamps can tie, so id cursors (after=) are preferred
         dt = parse_datetime(since)
         if dt:
             qs = qs.filter(created_at__gt=dt)
 
-    data = [{
-        'id': m.id,
-        'sender': m.sender.username,
-        'content': m.content,
-        'created_at': timezone.localtime(m.created_at).isoformat()
-    } for m in qs[:100]]
-
-    # Mark received messages as read
-    DirectMessage.objects.filter(receiver=request.user, sender=other, is_read=False).update(is_read=True)
+    messages_qs = list(qs[:DM_BATCH_SIZE])
+    if _has_unread(messages_qs, request.user):
+        conversation.mark_read(request.user)
+    data = [m.as_dict() for m in messages_qs]
 
-    # CHANGED: disable caching
+    # Always revalidate; an unchanged thread is answered 304 from the ETag
     resp = JsonResponse({'results': data})
-    resp['Cache-Control'] = 'no-store'
+    resp['Cache-Control'] = 'private, no-cache'
+    return resp
+
+def _dm_participants(request, username):
+    """``(user, other, error_response)`` for dm_wait; runs in a thread (request.user hits the DB)"""
+    if not request.user.is_authenticated:
+        return None, None, JsonResponse({'results': []}, status=401)
+    other = User.objects.filter(username=username).first()
+    if not other or other == request.user:
+        return None, None, JsonResponse({'results': []}, status=404)
+    return request.user, other, None
+
+def _dm_deliver(user, other, after):
+    """Messages with an id above ``after``, oldest first, marked read for ``user`` if any were unread"""
+    conversation = Conversation.between(user, other)
+    if not conversation:
+        return []
+    messages_qs = list(conversation.messages.filter(pk__gt=after).select_related('sender').order_by('pk')[:DM_BATCH_SIZE])
+    if _has_unread(messages_qs, user):
+        conversation.mark_read(user)
+    return [m.as_dict() for m in messages_qs]
+
+async def dm_wait(request, username):
+    """Long-poll for messages after the id cursor ``after``.
+
+    Answers at once when there are newer messages, otherwise waits (without
+    holding a worker thread under ASGI) until the next send in the thread or
+    DM_LONG_POLL_TIMEOUT seconds. Under WSGI it never waits and asks the client
+    to come back after ``retry_after`` seconds instead. The response's
+    ``cursor`` is the next ``after``.
+    """
+    try:
+        after = int(request.GET.get('after') or 0)
+    except ValueError:
+        return JsonResponse({'results': [], 'error': 'Invalid cursor'}, status=400)
+    max_wait = getattr(settings, 'DM_LONG_POLL_TIMEOUT', 25)
+    try:
+        wait = max(0.0, min(float(request.GET.get('timeout', max_wait)), max_wait))
+    except ValueError:
+        wait = max_wait
+    retry_after = 0
+    if not isinstance(request, ASGIRequest):
+        # A waiting request would pin a sync worker, and the in-process broker never hears
+        # sends handled by the other workers: answer straight away and let the client poll
+        wait = 0
+        retry_after = getattr(settings, 'DM_POLL_INTERVAL', 3)
+    user, other, error = await sync_to_async(_dm_participants)(request, username)
+    if error:
+        return error
+
+    # Subscribe before reading so a message committed in between still wakes this request
+    with get_broker().subscribe(Conversation.channel(user, other)) as subscription:
+        results = await sync_to_async(_dm_deliver)(user, other, after)
+        if not results and wait and await subscription.get(wait) is not None:
+            results = await sync_to_async(_dm_deliver)(user, other, after)
+    resp = JsonResponse({
+        'results': results,
+        'cursor': results[-1]['id'] if results else after,
+        'retry_after': retry_after,
+    })
+    resp['Cache-Control'] = 'private, no-store'
     return resp